@@ -21,8 +21,20 @@ except UnicodeDecodeError:
 
         warnings.warn("Não foi possível decodificar .env com encodings comuns; verifique o arquivo .env")
 
+import time
+
 import streamlit as st
-from src.database.operations import init_db, obter_estatisticas
+from src.database.metricas import metricas
+from src.database.operations import (
+    init_db,
+    executar_em_paralelo,
+    obter_kpis,
+    obter_estatisticas,
+    listar_chamados_abertos,
+    obter_checklist_matriz,
+    obter_saude_modulos,
+    resumo_cobrancas,
+)
 from src.utils.constants import CSS_STYLES
 from src.utils.helpers import exibir_mensagens_persistentes
 from src.components.dashboard import renderizar_dashboard
@@ -32,6 +44,7 @@ from src.components.historico import renderizar_historico
 from src.components.clientes import renderizar_gestao_clientes
 from src.components.cobrancas_lista import renderizar_cobrancas_lista
 from src.components.regras import renderizar_regras
+from src.components.desempenho import renderizar_painel_desempenho
 
 st.set_page_config(
     page_title="Gestão de Integrações",
@@ -52,23 +65,51 @@ TABS_SPACING_CSS = """
 st.markdown(CSS_STYLES, unsafe_allow_html=True)
 st.markdown(TABS_SPACING_CSS, unsafe_allow_html=True)
 
-if "db_initialized" not in st.session_state:
-    init_db()
-    st.session_state["db_initialized"] = True
+# Conferência de versão do esquema: executa uma vez por processo (cache_resource)
+init_db()
+
+# ─── PÁGINAS ──────────────────────────────────────────────────────────────────
+# Só a página escolhida é executada a cada rerun. Cada uma declara as leituras
+# que faz logo ao abrir, pré-carregadas em paralelo junto com as da barra lateral.
+PAGINAS = {
+    "Dashboard": (renderizar_dashboard, {"estatisticas": obter_estatisticas}),
+    "Chamados": (renderizar_chamados, {"abertos": listar_chamados_abertos}),
+    "Cobranças": (renderizar_cobrancas_lista, {
+        "cobrancas": resumo_cobrancas,
+        "abertos": listar_chamados_abertos,
+    }),
+    "Checklist": (renderizar_checklist, {
+        "checklist": (obter_checklist_matriz, None, None),
+        "saude": (obter_saude_modulos, None),
+    }),
+    "Histórico": (renderizar_historico, {}),
+    "Regras": (renderizar_regras, {}),
+    "Desempenho": (lambda: renderizar_painel_desempenho(len(PAGINAS)), {}),
+}
+
+pagina = st.session_state.get("pagina", "Dashboard")
+if pagina not in PAGINAS:
+    pagina = st.session_state["pagina"] = "Dashboard"
+
+# As chamadas seguintes encontram o cache pronto; falhas aparecem na própria página
+try:
+    executar_em_paralelo({"kpis": obter_kpis, **PAGINAS[pagina][1]})
+except Exception:
+    pass
 
 # ─── SIDEBAR ──────────────────────────────────────────────────────────────────
 with st.sidebar:
     st.title("Gestão de Integrações")
     st.markdown("---")
 
-    # Métricas rápidas (reutiliza o cache de obter_estatisticas, sem query extra)
+    # Métricas rápidas (lidas da tabela kpi_counters, mantida por gatilhos)
     try:
-        stats = obter_estatisticas()
+        kpis = obter_kpis()
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Abertos", stats["total_abertos"])
+            st.metric("Abertos", kpis.get("total_abertos", 0))
         with col2:
-            st.metric("Ag. cliente", stats["aguardando_cliente"])
+            st.metric("Ag. cliente", kpis.get("aguardando_cliente", 0))
     except Exception:
         pass
 
@@ -84,32 +125,19 @@ with st.sidebar:
     with st.expander("Clientes", expanded=False):
         renderizar_gestao_clientes()
 
-# ─── ABAS PRINCIPAIS ──────────────────────────────────────────────────────────
+# ─── PÁGINA ATIVA ─────────────────────────────────────────────────────────────
 exibir_mensagens_persistentes()
 
-aba_dash, aba_chamados, aba_cobrancas, aba_checklist, aba_hist, aba_regras = st.tabs([
-    "Dashboard",
-    "Chamados",
-    "Cobranças",
-    "Checklist",
-    "Histórico",
-    "Regras",
-])
-
-with aba_dash:
-    renderizar_dashboard()
-
-with aba_chamados:
-    renderizar_chamados()
-
-with aba_cobrancas:
-    renderizar_cobrancas_lista()
-
-with aba_checklist:
-    renderizar_checklist()
-
-with aba_hist:
-    renderizar_historico()
+st.radio(
+    "Página",
+    list(PAGINAS),
+    key="pagina",
+    horizontal=True,
+    label_visibility="collapsed",
+)
 
-with aba_regras:
-    renderizar_regras()
+inicio = time.perf_counter()
+try:
+    PAGINAS[pagina][0]()
+finally:
+    metricas.registrar_render(pagina, (time.perf_counter() - inicio) * 1000)
@@ -1,9 +1,11 @@
 import streamlit as st
 from datetime import date, datetime
 from src.database.operations import (
-    listar_clientes,
     listar_chamados_abertos,
-    listar_chamados_resolvidos,
+    listar_chamados_resolvidos_pagina,
+    listar_cobrancas_por_chamados,
+    agrupar_por_chamado,
+    buscar_chamados,
     adicionar_chamado,
     atualizar_chamado,
     resolver_chamado,
@@ -23,15 +25,20 @@ from src.utils.helpers import (
     cor_dias_aberto,
     adicionar_mensagem,
     exibir_mensagens_persistentes,
+    cursor_pagina_atual,
+    renderizar_paginacao,
 )
 from src.components.cobrancas import renderizar_cobrancas
+from src.components.clientes import selecionar_cliente
+
+_POR_PAGINA = 30
 
 
 def renderizar_chamados():
     exibir_mensagens_persistentes()
 
-    aba_abertos, aba_resolvidos, aba_novo = st.tabs([
-        "📋 Abertos", "✅ Resolvidos", "➕ Novo chamado"
+    aba_abertos, aba_resolvidos, aba_pesquisa, aba_novo = st.tabs([
+        "📋 Abertos", "✅ Resolvidos", "🔎 Pesquisa", "➕ Novo chamado"
     ])
 
     with aba_abertos:
@@ -40,6 +47,9 @@ def renderizar_chamados():
     with aba_resolvidos:
         _renderizar_lista_resolvidos()
 
+    with aba_pesquisa:
+        _renderizar_pesquisa()
+
     with aba_novo:
         _renderizar_form_novo_chamado()
 
@@ -64,19 +74,75 @@ def _renderizar_lista_abertos():
 
     filtrados = _filtrar_chamados(chamados, busca, filtro_status, filtro_resp, filtro_respon)
 
-    st.markdown(f"**{len(filtrados)} chamado(s)**")
+    col_total, col_modo = st.columns([3, 2])
+    with col_total:
+        st.markdown(f"**{len(filtrados)} chamado(s)**")
+    with col_modo:
+        modo = st.radio(
+            "Exibição", ["Lista", "Cartões"], horizontal=True,
+            key="modo_abertos", label_visibility="collapsed",
+        )
 
-    for ch in filtrados:
-        _renderizar_card_chamado(ch, modo="aberto")
+    # Uma página por vez (a lista já está em memória, o cursor é a posição);
+    # as cobranças da página vêm de uma única query
+    filtros = (busca, filtro_status, filtro_resp, filtro_respon)
+    inicio = cursor_pagina_atual("pag_abertos", filtros) or 0
+    pagina = filtrados[inicio:inicio + _POR_PAGINA]
+    proximo = inicio + _POR_PAGINA if inicio + _POR_PAGINA < len(filtrados) else None
+    cobrancas = agrupar_por_chamado(listar_cobrancas_por_chamados(tuple(ch["id"] for ch in pagina)))
+
+    if modo == "Cartões":
+        for ch in pagina:
+            _renderizar_card_chamado(ch, modo="aberto", cobrancas=cobrancas.get(ch["id"], []))
+        renderizar_paginacao("pag_abertos", proximo)
+        return
 
+    # Lista: uma linha de resumo por chamado; o card completo (ações e
+    # cobranças) só do chamado selecionado
+    # A seleção da tabela é uma posição na página: a chave muda com os filtros
+    # e com as linhas exibidas, para não selecionar outro chamado no lugar
+    chave = f"tabela_abertos_{hash((filtros, tuple(ch['id'] for ch in pagina))) & 0xFFFFFFFF:08x}"
+    selecionado = _renderizar_resumo_abertos(pagina, cobrancas, chave=chave)
+    renderizar_paginacao("pag_abertos", proximo)
+    if selecionado is None:
+        st.caption("Selecione um chamado na lista para ver os detalhes, as ações e as cobranças.")
+    else:
+        _renderizar_card_chamado(
+            selecionado, modo="aberto", cobrancas=cobrancas.get(selecionado["id"], []), expandido=True,
+        )
 
-def _renderizar_lista_resolvidos():
-    chamados = listar_chamados_resolvidos()
 
-    if not chamados:
-        st.info("Nenhum chamado resolvido encontrado.")
-        return
+def _renderizar_resumo_abertos(pagina, cobrancas, chave: str):
+    """Tabela compacta da página; retorna o chamado selecionado (ou None)."""
+    linhas = []
+    for ch in pagina:
+        cobs = cobrancas.get(ch["id"], [])
+        pendentes = sum(1 for c in cobs if not c["respondido"])
+        linhas.append({
+            "#": ch["id"],
+            "Cliente": ch["cliente_nome"],
+            "Título": ch["titulo"],
+            "Categoria": ch["categoria"],
+            "Status": ch["status"],
+            "Responsável": ch["responsavel"],
+            "Dias": calcular_dias_aberto(ch["data_abertura"]),
+            "Cobranças": f"{len(cobs)} ({pendentes} pendente(s))" if pendentes else str(len(cobs)),
+        })
+    evento = st.dataframe(
+        linhas,
+        key=chave,
+        on_select="rerun",
+        selection_mode="single-row",
+        hide_index=True,
+        use_container_width=True,
+    )
+    selecao = evento.selection.rows
+    if selecao and selecao[0] < len(pagina):
+        return pagina[selecao[0]]
+    return None
 
+
+def _renderizar_lista_resolvidos():
     col1, col2, col3 = st.columns(3)
     with col1:
         busca = st.text_input("🔍 Buscar cliente", key="filtro_busca_res", placeholder="Nome do cliente...")
@@ -85,20 +151,70 @@ def _renderizar_lista_resolvidos():
     with col3:
         filtro_cat = st.selectbox("Categoria", ["Todas"] + CATEGORIAS, key="filtro_cat_res")
 
-    filtrados = [
-        c for c in chamados
-        if (not busca or busca.lower() in c["cliente_nome"].lower())
-        and (filtro_resp == "Todos" or c["responsavel"] == filtro_resp)
-        and (filtro_cat == "Todas" or c["categoria"] == filtro_cat)
-    ]
+    # Filtros aplicados no SQL; a lista é carregada uma página por vez
+    cursor = cursor_pagina_atual("pag_resolvidos", (busca, filtro_resp, filtro_cat))
+    chamados, proximo = listar_chamados_resolvidos_pagina(
+        busca=busca.strip() or None,
+        responsavel=filtro_resp,
+        categoria=filtro_cat,
+        cursor=cursor,
+        limite=_POR_PAGINA,
+    )
+
+    if not chamados:
+        st.info("Nenhum chamado resolvido encontrado.")
+        return
 
-    st.markdown(f"**{len(filtrados)} chamado(s) resolvido(s)**")
+    st.markdown(f"**{len(chamados)} chamado(s) resolvido(s) nesta página**")
 
-    for ch in filtrados:
+    for ch in chamados:
         _renderizar_card_chamado(ch, modo="resolvido")
 
+    renderizar_paginacao("pag_resolvidos", proximo)
+
+
+def _renderizar_pesquisa():
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        termo = st.text_input(
+            "🔎 Pesquisar nos chamados e cobranças",
+            key="pesquisa_termo",
+            placeholder='Ex.: divergência pis, "nota fiscal" -cancelada',
+        )
+    with col2:
+        filtro_resp = st.selectbox("Responsável", ["Todos"] + RESPONSAVEIS, key="pesquisa_resp")
+
+    if not termo.strip():
+        st.caption("Busca em título, descrição, resolução e nas mensagens e respostas das cobranças.")
+        return
+
+    cursor = cursor_pagina_atual("pag_pesquisa", (termo, filtro_resp))
+    resultados, proximo = buscar_chamados(
+        termo, responsavel=filtro_resp, cursor=cursor, limite=_POR_PAGINA
+    )
+
+    if not resultados:
+        st.info("Nenhum chamado encontrado.")
+        return
+
+    st.markdown(f"**{resultados[0]['total']} chamado(s) encontrado(s)**")
+
+    for ch in resultados:
+        titulo_exp = f"#{ch['id']} · {ch['cliente_nome']} · {ch['titulo']} · {ch['status']}"
+        with st.expander(titulo_exp, expanded=False):
+            st.markdown(ch["trecho"] or ch["titulo"])
+            st.markdown(
+                f"**Categoria:** {ch['categoria']}  \n"
+                f"**Responsável:** {ch['responsavel']}  \n"
+                f"**Abertura:** {formatar_data_br(ch['data_abertura'])}"
+                + (f"  \n**Resolvido em:** {formatar_data_br(ch['data_resolucao'])}"
+                   if ch["data_resolucao"] else "")
+            )
+
+    renderizar_paginacao("pag_pesquisa", proximo)
 
-def _renderizar_card_chamado(ch, modo: str):
+
+def _renderizar_card_chamado(ch, modo: str, cobrancas=None, expandido: bool = False):
     dias = calcular_dias_aberto(ch["data_abertura"])
     css_dias = cor_dias_aberto(dias)
 
@@ -107,7 +223,7 @@ def _renderizar_card_chamado(ch, modo: str):
         f"{ch['categoria']} · {ch['status']}"
     )
 
-    with st.expander(titulo_exp, expanded=False):
+    with st.expander(titulo_exp, expanded=expandido):
         col1, col2, col3 = st.columns(3)
 
         with col1:
@@ -142,10 +258,13 @@ def _renderizar_card_chamado(ch, modo: str):
         if modo == "aberto":
             _renderizar_acoes_chamado(ch)
             st.markdown("---")
-            renderizar_cobrancas(ch["id"], ch["responsabilidade"])
+            renderizar_cobrancas(ch["id"], ch["responsabilidade"], cobrancas)
 
 
+@st.fragment
 def _renderizar_acoes_chamado(ch):
+    # Fragmento: abrir/fechar os formulários roda só este painel; escritas
+    # recarregam a página inteira (a lista, os KPIs e o card mudam)
     col_e, col_r, col_d = st.columns(3)
 
     chave_edit = f"editando_{ch['id']}"
@@ -236,7 +355,7 @@ def _renderizar_form_edicao(ch):
         with col_c:
             if st.form_submit_button("Cancelar"):
                 st.session_state.pop(f"editando_{ch['id']}", None)
-                st.rerun()
+                st.rerun(scope="fragment")
 
 
 def _renderizar_form_resolucao(ch):
@@ -261,25 +380,21 @@ def _renderizar_form_resolucao(ch):
         with col_c:
             if st.form_submit_button("Cancelar"):
                 st.session_state.pop(f"resolvendo_{ch['id']}", None)
-                st.rerun()
+                st.rerun(scope="fragment")
 
 
+@st.fragment
 def _renderizar_form_novo_chamado():
-    clientes = listar_clientes()
-    if not clientes:
-        st.warning("Cadastre pelo menos um cliente antes de abrir chamados.")
+    cliente = selecionar_cliente("novo_chamado_cliente", "Cliente *")
+    if not cliente:
+        st.warning("Selecione um cliente (cadastre-o antes, se ainda não existir) para abrir o chamado.")
         return
 
-    nomes = [c["nome"] for c in clientes]
-    ids = {c["nome"]: c["id"] for c in clientes}
-    resp_por_id = {c["id"]: c["responsavel"] for c in clientes}
-
     with st.form("form_novo_chamado", clear_on_submit=True):
-        st.markdown("**Novo chamado**")
+        st.markdown(f"**Novo chamado · {cliente['nome']}**")
 
         col1, col2 = st.columns(2)
         with col1:
-            cliente_nome = st.selectbox("Cliente *", nomes)
             titulo = st.text_input("Título *", placeholder="Resumo curto do problema...")
             categoria = st.selectbox("Categoria *", CATEGORIAS)
         with col2:
@@ -297,19 +412,17 @@ def _renderizar_form_novo_chamado():
             if not titulo.strip():
                 st.error("Título é obrigatório.")
             else:
-                cliente_id = ids[cliente_nome]
-                responsavel_cliente = resp_por_id.get(cliente_id)
                 adicionar_chamado(
-                    cliente_id=cliente_id,
+                    cliente_id=cliente["id"],
                     titulo=titulo,
                     categoria=categoria,
                     status=status,
                     responsabilidade=responsabilidade,
-                    responsavel=responsavel_cliente,
+                    responsavel=cliente["responsavel"],
                     descricao=descricao,
                     data_abertura=data_abertura,
                 )
-                adicionar_mensagem("sucesso", f"Chamado '{titulo}' aberto para {cliente_nome}.")
+                adicionar_mensagem("sucesso", f"Chamado '{titulo}' aberto para {cliente['nome']}.")
                 st.rerun()
 
 
@@ -326,18 +439,14 @@ def _filtrar_chamados(chamados, busca, filtro_status, filtro_resp, filtro_respon
     return resultado
 
 
+@st.fragment
 def renderizar_form_rapido():
-    clientes = listar_clientes()
-    if not clientes:
-        st.caption("Sem clientes cadastrados.")
+    # Fragmento: a busca de cliente e a validação não reexecutam o app
+    cliente = selecionar_cliente("rapido_cliente", "Cliente")
+    if not cliente:
         return
 
-    nomes = [c["nome"] for c in clientes]
-    ids = {c["nome"]: c["id"] for c in clientes}
-    resp_por_id = {c["id"]: c["responsavel"] for c in clientes}
-
     with st.form("form_rapido", clear_on_submit=True):
-        cliente_nome = st.selectbox("Cliente", nomes, key="rapido_cliente")
         titulo = st.text_input("Título *", placeholder="Resumo rápido...", key="rapido_titulo")
         col1, col2 = st.columns(2)
         with col1:
@@ -350,15 +459,13 @@ def renderizar_form_rapido():
             if not titulo.strip():
                 st.error("Título é obrigatório.")
             else:
-                cliente_id = ids[cliente_nome]
-                responsavel_cliente = resp_por_id.get(cliente_id)
                 adicionar_chamado(
-                    cliente_id=cliente_id,
+                    cliente_id=cliente["id"],
                     titulo=titulo,
                     categoria=categoria,
                     status="Aberto",
                     responsabilidade=responsabilidade,
-                    responsavel=responsavel_cliente,
+                    responsavel=cliente["responsavel"],
                     descricao="",
                     data_abertura=data_abertura,
                 )
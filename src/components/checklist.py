@@ -1,9 +1,8 @@
 import streamlit as st
 from src.database.operations import (
-    obter_checklist_completo,
-    atualizar_status_modulo,
-    listar_clientes,
-    listar_chamados_abertos,
+    obter_checklist_matriz,
+    obter_saude_modulos,
+    atualizar_checklist_em_lote,
 )
 from src.utils.constants import (
     MODULOS_CHECKLIST,
@@ -15,6 +14,7 @@ from src.utils.constants import (
     CORES_STATUS_IMPLANTACAO,
 )
 from src.utils.helpers import adicionar_mensagem
+from src.utils.renderizacao import Modelo, html_em_cache
 
 
 _LABEL_STATUS = {
@@ -24,6 +24,53 @@ _LABEL_STATUS = {
     "na": "— N/A",
 }
 
+# Opções de "Mostrar" → filtro de obter_checklist_matriz (aplicado no SQL)
+_FILTROS_MOSTRAR = {
+    "Todos": None,
+    "Com problemas": "problema",
+    "Com pendências (não ok)": "pendente",
+    "Em construção": "construcao",
+}
+
+_SEM_IMPLANTACAO = "3. Novo cliente sem integração"
+
+_TABELA = Modelo(
+    '<table class="ck-table">'
+    '<thead><tr>'
+    '<th class="col-cliente">Cliente</th>'
+    '<th class="col-impl">Implantação</th>'
+    '{cabecalho_modulos!s}'
+    '<th>Resumo</th>'
+    '</tr></thead><tbody>{linhas!s}</tbody></table>'
+)
+
+_LINHA = Modelo(
+    '<tr>'
+    '<td class="col-cliente"><strong>{nome}</strong><br>'
+    '<small style="color:#6c757d">{responsavel}</small></td>'
+    '<td class="col-impl">'
+    '<span class="impl-badge" style="background:{cor_si}">{si}</span>'
+    '</td>'
+    '{celulas!s}'
+    '<td style="text-align:center">{badge!s}</td>'
+    '</tr>'
+)
+
+_BADGE = Modelo('<span class="resumo-badge" style="background:{fundo};color:{cor}">{texto}</span>')
+
+# As células dependem só do status do módulo: montadas uma vez por (módulo, status)
+_CELULAS = {
+    (mod, st_mod): Modelo('<td class="{css}" title="{titulo}">{icone}</td>')(
+        css=f"cell-{st_mod}",
+        titulo=f"{mod}: {_LABEL_STATUS[st_mod]}",
+        icone=ICONES_CHECKLIST[st_mod],
+    )
+    for mod in MODULOS_CHECKLIST
+    for st_mod in _LABEL_STATUS
+}
+
+_CABECALHO_MODULOS = "".join(Modelo("<th>{mod}</th>")(mod=mod) for mod in MODULOS_CHECKLIST)
+
 _CSS_CHECKLIST = """
 <style>
 .ck-table { width: 100%; border-collapse: collapse; font-size: 14px; }
@@ -83,8 +130,8 @@ def renderizar_checklist():
     st.markdown(_CSS_CHECKLIST, unsafe_allow_html=True)
     st.markdown("### Checklist de Integrações")
 
-    clientes = listar_clientes()
-    if not clientes:
+    # A matriz sem filtros (pré-carregada pelo app) tem uma linha por cliente ativo
+    if not obter_checklist_matriz(None, None):
         st.info("Nenhum cliente cadastrado. Adicione clientes na barra lateral.")
         return
 
@@ -98,126 +145,39 @@ def renderizar_checklist():
     with col_f2:
         filtro_status = st.selectbox(
             "Mostrar",
-            ["Todos", "Com problemas", "Com pendências (não ok)", "Em construção"],
+            list(_FILTROS_MOSTRAR),
             key="checklist_filtro_status",
         )
 
-    checklist_raw = obter_checklist_completo()
-    chamados_abertos = listar_chamados_abertos()
-
-    # Montar estrutura: {cliente_id: {modulo: row}}
-    dados: dict = {}
-    for row in checklist_raw:
-        cid = row["cliente_id"]
-        if cid not in dados:
-            dados[cid] = {
-                "id": cid,
-                "nome": row["cliente_nome"],
-                "responsavel": row["cliente_responsavel"],
-                "status_implantacao": row["cliente_status_implantacao"] or "3. Novo cliente sem integração",
-                "modulos": {},
-            }
-        dados[cid]["modulos"][row["modulo"]] = dict(row)
-
-    # Filtrar por responsável
-    if filtro_resp != "Todos":
-        dados = {k: v for k, v in dados.items() if v["responsavel"] == filtro_resp}
-
-    # Filtrar por status
-    if filtro_status == "Com problemas":
-        dados = {
-            k: v for k, v in dados.items()
-            if any(m.get("status") == "problema" for m in v["modulos"].values())
-        }
-    elif filtro_status == "Com pendências (não ok)":
-        dados = {
-            k: v for k, v in dados.items()
-            if any(m.get("status") != "ok" for m in v["modulos"].values())
-        }
-    elif filtro_status == "Em construção":
-        dados = {
-            k: v for k, v in dados.items()
-            if any(m.get("status") == "construcao" for m in v["modulos"].values())
-        }
-
-    if not dados:
+    # Pivô, contadores e filtros calculados no banco: uma linha por cliente
+    responsavel = None if filtro_resp == "Todos" else filtro_resp
+    matriz = obter_checklist_matriz(responsavel, _FILTROS_MOSTRAR[filtro_status])
+
+    if not matriz:
         st.info("Nenhum cliente encontrado com esse filtro.")
         return
 
     # ── Resumo rápido ──────────────────────────────────────────────────────────
-    total_clientes = len(dados)
-    total_problemas = sum(
-        1 for v in dados.values()
-        for m in v["modulos"].values() if m.get("status") == "problema"
-    )
-    total_construcao = sum(
-        1 for v in dados.values()
-        for m in v["modulos"].values() if m.get("status") == "construcao"
-    )
-    total_na = sum(
-        1 for v in dados.values()
-        for m in v["modulos"].values() if m.get("status") == "na"
-    )
-
     c1, c2, c3, c4 = st.columns(4)
     with c1:
-        st.metric("Clientes", total_clientes)
+        st.metric("Clientes", len(matriz))
     with c2:
-        st.metric("Problemas", total_problemas)
+        st.metric("Problemas", sum(r["n_problema"] for r in matriz))
     with c3:
-        st.metric("Em construção", total_construcao)
+        st.metric("Em construção", sum(r["n_construcao"] for r in matriz))
     with c4:
-        st.metric("N/A", total_na)
+        st.metric("N/A", sum(r["n_na"] for r in matriz))
+
+    _renderizar_saude_modulos(obter_saude_modulos(responsavel))
 
     st.markdown("---")
 
     # ── Tabela HTML visual ─────────────────────────────────────────────────────
-    html = ['<table class="ck-table">']
-    html.append('<thead><tr>')
-    html.append('<th class="col-cliente">Cliente</th>')
-    html.append('<th class="col-impl">Implantação</th>')
-    for mod in MODULOS_CHECKLIST:
-        html.append(f'<th>{mod}</th>')
-    html.append('<th>Resumo</th>')
-    html.append('</tr></thead><tbody>')
-
-    for cid, info in dados.items():
-        n_prob = sum(1 for m in info["modulos"].values() if m.get("status") == "problema")
-        n_const = sum(1 for m in info["modulos"].values() if m.get("status") == "construcao")
-
-        if n_prob > 0:
-            badge = f'<span class="resumo-badge" style="background:#fde8e8;color:#b91c1c">{n_prob} problema(s)</span>'
-        elif n_const > 0:
-            badge = f'<span class="resumo-badge" style="background:#dbeafe;color:#1d4ed8">{n_const} em construção</span>'
-        else:
-            badge = '<span class="resumo-badge" style="background:#d1f5e0;color:#0a6640">tudo ok</span>'
-
-        si = info["status_implantacao"]
-        cor_si = CORES_STATUS_IMPLANTACAO.get(si, "#6c757d")
-
-        html.append('<tr>')
-        html.append(
-            f'<td class="col-cliente"><strong>{info["nome"]}</strong><br>'
-            f'<small style="color:#6c757d">{info["responsavel"]}</small></td>'
-        )
-        html.append(
-            f'<td class="col-impl">'
-            f'<span class="impl-badge" style="background:{cor_si}">{si}</span>'
-            f'</td>'
-        )
-        for mod in MODULOS_CHECKLIST:
-            row = info["modulos"].get(mod)
-            st_mod = row["status"] if row else "ok"
-            icone = ICONES_CHECKLIST[st_mod]
-            css_class = f"cell-{st_mod}"
-            label = _LABEL_STATUS[st_mod]
-            html.append(f'<td class="{css_class}" title="{mod}: {label}">{icone}</td>')
-
-        html.append(f'<td style="text-align:center">{badge}</td>')
-        html.append('</tr>')
-
-    html.append('</tbody></table>')
-    st.markdown("\n".join(html), unsafe_allow_html=True)
+    # Mesmo snapshot do checklist, mesmos filtros e mesmo dia → mesmo HTML
+    html = html_em_cache(
+        "checklist", matriz, (filtro_resp, filtro_status), lambda: _html_tabela(matriz),
+    )
+    st.markdown(html, unsafe_allow_html=True)
 
     # ── Legenda ────────────────────────────────────────────────────────────────
     st.markdown("")
@@ -231,23 +191,67 @@ def renderizar_checklist():
 
     st.markdown("---")
 
-    # ── Seção de edição ────────────────────────────────────────────────────────
+    _renderizar_editor(matriz)
+
+
+def _renderizar_saude_modulos(saude):
+    """Uma métrica por módulo: % ok e, se houver, % com problema."""
+    if not saude:
+        return
+    st.markdown("**Saúde por módulo**")
+    for coluna, m in zip(st.columns(len(saude)), saude):
+        with coluna:
+            st.metric(
+                m["modulo"],
+                f"{m['pct_ok']:.0f}% ok",
+                delta=f"{m['pct_problema']:.1f}% problema" if m["problema"] else None,
+                delta_color="inverse",
+                help=(f"{m['ok']} ok · {m['problema']} problema · "
+                      f"{m['construcao']} em construção · {m['na']} N/A (de {m['total']})"),
+            )
+
+
+def _html_tabela(matriz) -> str:
+    linhas = []
+    for row in matriz:
+        if row["n_problema"] > 0:
+            badge = _BADGE(fundo="#fde8e8", cor="#b91c1c", texto=f"{row['n_problema']} problema(s)")
+        elif row["n_construcao"] > 0:
+            badge = _BADGE(fundo="#dbeafe", cor="#1d4ed8", texto=f"{row['n_construcao']} em construção")
+        else:
+            badge = _BADGE(fundo="#d1f5e0", cor="#0a6640", texto="tudo ok")
+
+        si = row["cliente_status_implantacao"] or _SEM_IMPLANTACAO
+        linhas.append(_LINHA(
+            nome=row["cliente_nome"],
+            responsavel=row["cliente_responsavel"],
+            cor_si=CORES_STATUS_IMPLANTACAO.get(si, "#6c757d"),
+            si=si,
+            celulas="".join(_CELULAS[mod, row[mod]] for mod in MODULOS_CHECKLIST),
+            badge=badge,
+        ))
+    return _TABELA(cabecalho_modulos=_CABECALHO_MODULOS, linhas="".join(linhas))
+
+
+@st.fragment
+def _renderizar_editor(matriz):
+    # Fragmento: trocar de cliente não reexecuta a página; salvar recarrega a
+    # tabela acima
     st.markdown("#### Editar status")
     st.caption("Selecione o cliente e edite todos os módulos de uma vez.")
 
-    nomes_clientes = {info["nome"]: cid for cid, info in dados.items()}
+    por_nome = {row["cliente_nome"]: row for row in matriz}
     opcoes_label = [_LABEL_STATUS[s] for s in STATUS_CHECKLIST]
 
     cliente_sel_nome = st.selectbox(
-        "Cliente", list(nomes_clientes.keys()), key="ck_edit_cliente"
+        "Cliente", list(por_nome.keys()), key="ck_edit_cliente"
     )
-    cliente_sel_id = nomes_clientes[cliente_sel_nome]
+    cliente_sel = por_nome[cliente_sel_nome]
 
     with st.form("form_checklist_editar"):
         novos_status = {}
         for mod in MODULOS_CHECKLIST:
-            row_atual = dados[cliente_sel_id]["modulos"].get(mod)
-            status_atual = row_atual["status"] if row_atual else "ok"
+            status_atual = cliente_sel[mod]
             cor_atual = CORES_CHECKLIST[status_atual]
             icone_atual = ICONES_CHECKLIST[status_atual]
 
@@ -272,15 +276,14 @@ def renderizar_checklist():
                 novos_status[mod] = STATUS_CHECKLIST[opcoes_label.index(novo_label)]
 
         if st.form_submit_button("💾 Salvar todos", type="primary"):
-            alterados = 0
+            alteracoes = {}
             for mod in MODULOS_CHECKLIST:
-                row_atual = dados[cliente_sel_id]["modulos"].get(mod)
-                status_atual = row_atual["status"] if row_atual else "ok"
-                if novos_status[mod] != status_atual:
-                    atualizar_status_modulo(cliente_sel_id, mod, novos_status[mod], None)
-                    alterados += 1
+                if novos_status[mod] != cliente_sel[mod]:
+                    alteracoes[mod] = novos_status[mod]
+            alterados = len(alteracoes)
             if alterados:
+                atualizar_checklist_em_lote(cliente_sel["cliente_id"], alteracoes, None)
                 adicionar_mensagem("sucesso", f"{alterados} módulo(s) de {cliente_sel_nome} atualizados.")
+                st.rerun()
             else:
-                adicionar_mensagem("info", "Nenhuma alteração detectada.")
-            st.rerun()
+                st.toast("Nenhuma alteração detectada.")
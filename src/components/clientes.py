@@ -1,5 +1,11 @@
 import streamlit as st
-from src.database.operations import listar_clientes, adicionar_cliente, atualizar_cliente, excluir_cliente
+from src.database.operations import (
+    listar_clientes,
+    buscar_clientes,
+    adicionar_cliente,
+    atualizar_cliente,
+    excluir_cliente,
+)
 from src.utils.constants import RESPONSAVEIS, STATUS_IMPLANTACAO, CORES_STATUS_IMPLANTACAO
 from src.utils.helpers import adicionar_mensagem
 
@@ -82,3 +88,29 @@ def renderizar_gestao_clientes():
                         excluir_cliente(c["id"])
                         adicionar_mensagem("aviso", f"Cliente '{c['nome']}' desativado.")
                         st.rerun()
+
+
+def selecionar_cliente(chave: str, rotulo: str = "Cliente", opcao_todos: str = None, limite: int = 20):
+    """Campo de busca + seleção de cliente; só traz do banco os mais parecidos com o texto digitado.
+
+    Retorna a linha do cliente escolhido, ou None (nenhum encontrado ou `opcao_todos`).
+    Precisa ficar fora de st.form para a lista acompanhar o que é digitado.
+    """
+    termo = st.text_input(
+        f"🔍 Buscar {rotulo.lower().rstrip(' *')}",
+        key=f"{chave}_busca",
+        placeholder="Digite parte do nome...",
+    )
+    encontrados = {c["id"]: c for c in buscar_clientes(termo, limite)}
+    opcoes = ([None] if opcao_todos else []) + list(encontrados)
+    if not opcoes:
+        st.caption("Nenhum cliente encontrado.")
+        return None
+
+    escolhido = st.selectbox(
+        rotulo,
+        opcoes,
+        format_func=lambda cid: opcao_todos if cid is None else encontrados[cid]["nome"],
+        key=chave,
+    )
+    return encontrados.get(escolhido)
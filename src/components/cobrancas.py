@@ -9,8 +9,10 @@ from src.database.operations import (
 from src.utils.helpers import formatar_data_br, cobranca_atrasada, adicionar_mensagem
 
 
-def renderizar_cobrancas(chamado_id: int, responsabilidade: str):
-    cobrancas = listar_cobrancas_por_chamado(chamado_id)
+def renderizar_cobrancas(chamado_id: int, responsabilidade: str, cobrancas=None):
+    # `cobrancas` já carregadas (ex.: em lote para a página); senão, busca as do chamado
+    if cobrancas is None:
+        cobrancas = listar_cobrancas_por_chamado(chamado_id)
 
     st.markdown("#### Cobranças ao cliente")
 
@@ -27,6 +29,7 @@ def renderizar_cobrancas(chamado_id: int, responsabilidade: str):
         _renderizar_form_nova_cobranca(chamado_id)
 
 
+@st.fragment
 def _renderizar_card_cobranca(cob):
     respondido = bool(cob["respondido"])
     atrasado = not respondido and cobranca_atrasada(cob["data_envio"])
@@ -83,11 +86,12 @@ def _renderizar_card_cobranca(cob):
             with col_c:
                 if st.form_submit_button("Cancelar"):
                     st.session_state.pop(f"respondendo_{cob['id']}", None)
-                    st.rerun()
+                    st.rerun(scope="fragment")
 
     st.markdown("---")
 
 
+@st.fragment
 def _renderizar_form_nova_cobranca(chamado_id: int):
     chave = f"nova_cob_{chamado_id}"
     if st.button("📤 Registrar nova cobrança", key=f"btn_nova_cob_{chamado_id}"):
@@ -118,4 +122,4 @@ def _renderizar_form_nova_cobranca(chamado_id: int):
             with col_c:
                 if st.form_submit_button("Cancelar"):
                     st.session_state.pop(chave, None)
-                    st.rerun()
+                    st.rerun(scope="fragment")
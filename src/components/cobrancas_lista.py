@@ -1,15 +1,22 @@
 import streamlit as st
 from datetime import date
 from src.database.operations import (
-    listar_todas_cobrancas,
+    listar_cobrancas_pagina,
+    resumo_cobrancas,
     marcar_respondido,
     excluir_cobranca,
-    listar_clientes,
     listar_chamados_abertos,
     adicionar_cobranca,
 )
 from src.utils.constants import RESPONSAVEIS
-from src.utils.helpers import formatar_data_br, adicionar_mensagem, exibir_mensagens_persistentes
+from src.utils.helpers import (
+    formatar_data_br,
+    adicionar_mensagem,
+    exibir_mensagens_persistentes,
+    cursor_pagina_atual,
+    renderizar_paginacao,
+)
+from src.components.clientes import selecionar_cliente
 
 _CSS = """
 <style>
@@ -17,6 +24,14 @@ _CSS = """
 </style>
 """
 
+_POR_PAGINA = 50
+
+_FILTRO_RESPONDIDO = {
+    "Todas": None,
+    "Apenas pendentes": False,
+    "Apenas respondidas": True,
+}
+
 
 def renderizar_cobrancas_lista():
     st.markdown(_CSS, unsafe_allow_html=True)
@@ -35,25 +50,20 @@ def renderizar_cobrancas_lista():
         _renderizar_form_nova_cobranca()
 
     # ── KPIs ──────────────────────────────────────────────────────────────────
-    todas = listar_todas_cobrancas()
-    if not todas:
+    resumo = resumo_cobrancas()
+    if not resumo["total"]:
         st.info("Nenhuma cobrança registrada ainda. Clique em '➕ Nova cobrança' para começar.")
         return
 
-    total = len(todas)
-    pendentes = [c for c in todas if not c["respondido"]]
-    atrasadas = [c for c in pendentes if (c["dias_aguardando"] or 0) > 3]
-    respondidas = [c for c in todas if c["respondido"]]
-
     c1, c2, c3, c4 = st.columns(4)
     with c1:
-        st.metric("Total enviadas", total)
+        st.metric("Total enviadas", resumo["total"])
     with c2:
-        st.metric("Aguardando resposta", len(pendentes))
+        st.metric("Aguardando resposta", resumo["pendentes"])
     with c3:
-        st.metric("Atrasadas (>3 dias)", len(atrasadas), delta="urgente" if atrasadas else None)
+        st.metric("Atrasadas (>3 dias)", resumo["atrasadas"], delta="urgente" if resumo["atrasadas"] else None)
     with c4:
-        st.metric("Respondidas", len(respondidas))
+        st.metric("Respondidas", resumo["respondidas"])
 
     st.markdown("---")
 
@@ -62,32 +72,30 @@ def renderizar_cobrancas_lista():
     with col_f1:
         filtro_vis = st.selectbox(
             "Exibir",
-            ["Todas", "Apenas pendentes", "Apenas respondidas"],
+            list(_FILTRO_RESPONDIDO),
             key="cob_lista_vis",
         )
     with col_f2:
-        clientes = listar_clientes()
-        nomes = ["Todos os clientes"] + [c["nome"] for c in clientes]
-        filtro_cli = st.selectbox("Cliente", nomes, key="cob_lista_cli")
+        cliente = selecionar_cliente("cob_lista_cli", "Cliente", opcao_todos="Todos os clientes")
+        filtro_cli = cliente["id"] if cliente else None
     with col_f3:
         filtro_resp = st.selectbox("Responsável", ["Todos"] + RESPONSAVEIS, key="cob_lista_resp")
 
-    # Aplicar filtros
-    exibir = list(todas)
-    if filtro_vis == "Apenas pendentes":
-        exibir = [c for c in exibir if not c["respondido"]]
-    elif filtro_vis == "Apenas respondidas":
-        exibir = [c for c in exibir if c["respondido"]]
-    if filtro_cli != "Todos os clientes":
-        exibir = [c for c in exibir if c["cliente_nome"] == filtro_cli]
-    if filtro_resp != "Todos":
-        exibir = [c for c in exibir if c["cliente_responsavel"] == filtro_resp]
+    # Filtros aplicados no SQL; a lista é carregada uma página por vez
+    cursor = cursor_pagina_atual("pag_cobrancas", (filtro_vis, filtro_cli, filtro_resp))
+    exibir, proximo = listar_cobrancas_pagina(
+        respondido=_FILTRO_RESPONDIDO[filtro_vis],
+        cliente_id=filtro_cli,
+        responsavel=filtro_resp,
+        cursor=cursor,
+        limite=_POR_PAGINA,
+    )
 
     if not exibir:
         st.info("Nenhuma cobrança encontrada para os filtros selecionados.")
         return
 
-    st.markdown(f"**{len(exibir)} cobrança(s)**")
+    st.markdown(f"**{len(exibir)} cobrança(s) nesta página**")
     st.markdown("")
 
     # ── Agrupar: cliente → chamado → lista de cobranças ───────────────────────
@@ -119,6 +127,8 @@ def renderizar_cobrancas_lista():
     for cid in clientes_order:
         _renderizar_bloco_cliente(cid, por_cliente[cid])
 
+    renderizar_paginacao("pag_cobrancas", proximo)
+
 
 def _renderizar_bloco_cliente(cid, cli):
     total_cob = sum(len(ch["cobrancas"]) for ch in cli["chamados"].values())
@@ -185,6 +195,7 @@ def _renderizar_bloco_chamado(chid, ch):
         _renderizar_item_cobranca(cob, i, n, tem_respondida)
 
 
+@st.fragment
 def _renderizar_item_cobranca(cob, num, total, tem_respondida=False):
     respondido = bool(cob["respondido"])
     dias = int(cob["dias_aguardando"] or 0)
@@ -284,7 +295,7 @@ def _renderizar_item_cobranca(cob, num, total, tem_respondida=False):
             with col_c:
                 if st.form_submit_button("Cancelar"):
                     st.session_state.pop(f"resp_form_{cob['id']}", None)
-                    st.rerun()
+                    st.rerun(scope="fragment")
 
 
 def _renderizar_form_nova_cobranca():
@@ -4,6 +4,7 @@ import plotly.graph_objects as go
 from src.database.operations import obter_estatisticas
 from src.utils.helpers import formatar_data_br, calcular_dias_aberto, cor_dias_aberto
 from src.utils.constants import CORES_STATUS, CORES_STATUS_IMPLANTACAO
+from src.utils.renderizacao import Modelo, html_em_cache
 
 
 def renderizar_dashboard():
@@ -164,6 +165,38 @@ _COR_DIAS = {
 }
 _COR_RESP = {"Interna": "#0d6efd", "Cliente": "#fd7e14"}
 
+_TABELA_ANTIGOS = Modelo(
+    '<table class="ch-table"><thead><tr>'
+    '<th>Cliente</th>'
+    '<th>Título</th>'
+    '<th class="center">Categoria</th>'
+    '<th class="center">Implantação</th>'
+    '<th class="center">Status</th>'
+    '<th class="center">Responsável</th>'
+    '<th class="center">Abertura</th>'
+    '<th class="center">Dias aberto</th>'
+    '</tr></thead><tbody>{linhas!s}</tbody></table>'
+)
+
+_LINHA_ANTIGO = Modelo(
+    '<tr>'
+    '<td><strong>{cliente}</strong></td>'
+    '<td>{titulo}</td>'
+    '<td class="center">{categoria}</td>'
+    '<td class="center">'
+    '  <span class="ch-badge" style="background:{cor_si};font-size:11px">{si}</span>'
+    '</td>'
+    '<td class="center">'
+    '  <span class="ch-badge" style="background:{cor_status}">{status}</span>'
+    '</td>'
+    '<td class="center">{responsavel}</td>'
+    '<td class="center" style="white-space:nowrap">{abertura}</td>'
+    '<td class="center">'
+    '  <span class="dias-cell" style="color:{cor_dias}">{dias}d</span>'
+    '</td>'
+    '</tr>'
+)
+
 
 def _renderizar_chamados_antigos(stats):
     antigos = stats["mais_antigos"]
@@ -183,46 +216,27 @@ def _renderizar_chamados_antigos(stats):
             unsafe_allow_html=True,
         )
 
+    # Mesmo snapshot de estatísticas no mesmo dia → mesmo HTML
+    html = html_em_cache("chamados_antigos", antigos, (), lambda: _html_chamados_antigos(antigos))
+    st.markdown(html, unsafe_allow_html=True)
+
+
+def _html_chamados_antigos(antigos) -> str:
     linhas = []
     for ch in antigos:
         dias = calcular_dias_aberto(ch["data_abertura"])
-        css  = cor_dias_aberto(dias)
-        cor_dias = _COR_DIAS.get(css, "#6c757d")
-        cor_status = CORES_STATUS.get(ch["status"], "#6c757d")
         si = ch.get("cliente_status_implantacao") or "3. Novo cliente sem integração"
-        cor_si = CORES_STATUS_IMPLANTACAO.get(si, "#6c757d")
-
-        linhas.append(
-            f'<tr>'
-            f'<td><strong>{ch["cliente_nome"]}</strong></td>'
-            f'<td>{ch["titulo"]}</td>'
-            f'<td class="center">{ch["categoria"]}</td>'
-            f'<td class="center">'
-            f'  <span class="ch-badge" style="background:{cor_si};font-size:11px">{si}</span>'
-            f'</td>'
-            f'<td class="center">'
-            f'  <span class="ch-badge" style="background:{cor_status}">{ch["status"]}</span>'
-            f'</td>'
-            f'<td class="center">{ch["responsavel"]}</td>'
-            f'<td class="center" style="white-space:nowrap">{formatar_data_br(ch["data_abertura"])}</td>'
-            f'<td class="center">'
-            f'  <span class="dias-cell" style="color:{cor_dias}">{dias}d</span>'
-            f'</td>'
-            f'</tr>'
-        )
-
-    html = (
-        '<table class="ch-table"><thead><tr>'
-        '<th>Cliente</th>'
-        '<th>Título</th>'
-        '<th class="center">Categoria</th>'
-        '<th class="center">Implantação</th>'
-        '<th class="center">Status</th>'
-        '<th class="center">Responsável</th>'
-        '<th class="center">Abertura</th>'
-        '<th class="center">Dias aberto</th>'
-        '</tr></thead><tbody>'
-        + "".join(linhas)
-        + "</tbody></table>"
-    )
-    st.markdown(html, unsafe_allow_html=True)
+        linhas.append(_LINHA_ANTIGO(
+            cliente=ch["cliente_nome"],
+            titulo=ch["titulo"],
+            categoria=ch["categoria"],
+            cor_si=CORES_STATUS_IMPLANTACAO.get(si, "#6c757d"),
+            si=si,
+            cor_status=CORES_STATUS.get(ch["status"], "#6c757d"),
+            status=ch["status"],
+            responsavel=ch["responsavel"],
+            abertura=formatar_data_br(ch["data_abertura"]),
+            cor_dias=_COR_DIAS.get(cor_dias_aberto(dias), "#6c757d"),
+            dias=dias,
+        ))
+    return _TABELA_ANTIGOS(linhas="".join(linhas))
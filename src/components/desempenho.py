@@ -0,0 +1,161 @@
+import streamlit as st
+from src.database import cache
+from src.database.metricas import metricas
+
+
+def renderizar_painel_desempenho(total_paginas: int):
+    st.markdown("### Desempenho das queries")
+
+    resumo = metricas.resumo()
+    st.caption(
+        f"Coletado desde {resumo['desde'].replace('T', ' ')} neste processo · "
+        f"queries lentas: acima de {resumo['limite_lenta_ms']:.0f} ms (variável SLOW_QUERY_MS)"
+    )
+
+    col_exp, col_zerar, _ = st.columns([1, 1, 4])
+    with col_exp:
+        st.download_button(
+            "⬇️ Exportar JSON",
+            data=metricas.exportar_json(),
+            file_name="metricas_queries.json",
+            mime="application/json",
+            use_container_width=True,
+        )
+    with col_zerar:
+        if st.button("🔄 Zerar métricas", use_container_width=True):
+            metricas.limpar()
+            cache.zerar_estatisticas()
+            st.rerun()
+
+    _renderizar_cache()
+    _renderizar_paginas(resumo["renders"], total_paginas)
+
+    queries = resumo["queries"]
+    if not queries:
+        st.info("Nenhuma query registrada ainda.")
+        return
+
+    # ── Latência por query ────────────────────────────────────────────────────
+    linhas = [
+        {
+            "Query": nome,
+            "Chamadas": q["chamadas"],
+            "Média (ms)": q["media_ms"],
+            "p50 (ms)": q["p50_ms"],
+            "p95 (ms)": q["p95_ms"],
+            "Máx (ms)": q["max_ms"],
+            "Linhas (média)": q["linhas_media"],
+            "Erros": q["erros"],
+        }
+        for nome, q in sorted(queries.items(), key=lambda kv: -kv[1]["media_ms"] * kv[1]["chamadas"])
+    ]
+    st.markdown("#### Por query")
+    st.caption("Ordenado pelo tempo total gasto (média × chamadas). p50/p95 aproximados pelo histograma.")
+    st.dataframe(linhas, use_container_width=True, hide_index=True)
+
+    # ── Pool de conexões ──────────────────────────────────────────────────────
+    pool = resumo["espera_pool"]
+    st.markdown("#### Espera por conexão no pool")
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        st.metric("Conexões obtidas", pool["chamadas"])
+    with c2:
+        st.metric("Média", f"{pool['media_ms']} ms")
+    with c3:
+        st.metric("p95", f"{pool['p95_ms']} ms")
+    with c4:
+        st.metric("Máx", f"{pool['max_ms']} ms")
+
+    # ── Queries lentas ────────────────────────────────────────────────────────
+    st.markdown("#### Queries lentas")
+    lentas = resumo["lentas"]
+    if not lentas:
+        st.success("Nenhuma query acima do limite.")
+        return
+    st.dataframe(
+        [
+            {"Quando": l["quando"], "Query": l["nome"], "ms": l["ms"], "Linhas": l["linhas"], "SQL": l["sql"]}
+            for l in reversed(lentas)
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+def _renderizar_cache():
+    est = cache.estatisticas()
+    st.markdown("#### Cache de leituras")
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        st.metric("Entradas", f"{est['entradas']} / {est['max_entradas']}")
+    with c2:
+        st.metric("Memória estimada", f"{est['bytes'] / 1024 / 1024:.1f} / {est['max_bytes'] / 1024 / 1024:.0f} MB")
+    with c3:
+        acertos = sum(f["acertos"] + f["vencidas"] for f in est["funcoes"].values())
+        leituras = acertos + sum(f["faltas"] for f in est["funcoes"].values())
+        st.metric("Taxa de acerto", f"{100 * acertos / leituras:.1f}%" if leituras else "—")
+
+    if not est["funcoes"]:
+        st.info("Nenhuma leitura em cache ainda.")
+        return
+    st.caption(
+        "Vencidas: servidas após o TTL enquanto atualizam em segundo plano · "
+        "Esperas: faltas que aguardaram a consulta de outra sessão · "
+        "Despejos: entradas removidas por limite de tamanho (LRU)."
+    )
+    st.dataframe(
+        [
+            {
+                "Função": nome,
+                "Acertos": f["acertos"],
+                "Vencidas": f["vencidas"],
+                "Faltas": f["faltas"],
+                "Acerto (%)": f["taxa_acerto"],
+                "Esperas": f["esperas"],
+                "Deltas": f["deltas"],
+                "Despejos": f["despejos"],
+                "Entradas": f["entradas"],
+                "Memória (KB)": round(f["bytes"] / 1024, 1),
+            }
+            for nome, f in sorted(est["funcoes"].items(), key=lambda kv: -kv[1]["bytes"])
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+def _renderizar_paginas(renders, total_paginas):
+    st.markdown("#### Renderização por página")
+    if not renders:
+        st.info("Nenhuma página renderizada ainda.")
+        return
+
+    # Antes, cada rerun executava todas as abas; agora só a página ativa.
+    # A estimativa soma as médias das páginas já visitadas neste processo.
+    reruns = sum(r["chamadas"] for r in renders.values())
+    media_rerun = sum(r["media_ms"] * r["chamadas"] for r in renders.values()) / reruns
+    todas_abas = sum(r["media_ms"] for r in renders.values())
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        st.metric("Rerun (só a página ativa)", f"{media_rerun:.0f} ms")
+    with c2:
+        st.metric("Todas as abas (estimado)", f"{todas_abas:.0f} ms")
+    with c3:
+        st.metric("Economia por rerun", f"{todas_abas - media_rerun:.0f} ms")
+    if len(renders) < total_paginas:
+        st.caption("Páginas ainda não visitadas não entram na estimativa.")
+
+    st.dataframe(
+        [
+            {
+                "Página": pagina,
+                "Renders": r["chamadas"],
+                "Média (ms)": r["media_ms"],
+                "p95 (ms)": r["p95_ms"],
+                "Máx (ms)": r["max_ms"],
+            }
+            for pagina, r in sorted(renders.items(), key=lambda kv: -kv[1]["media_ms"])
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
@@ -1,10 +1,15 @@
+import codecs
+import csv
+import io
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import date, timedelta
-from src.database.operations import obter_historico
+from src.database.operations import obter_historico_pagina, contar_historico, iterar_historico
 from src.utils.constants import CATEGORIAS, RESPONSAVEIS, RESPONSABILIDADE
-from src.utils.helpers import formatar_data_br
+from src.utils.helpers import formatar_data_br, cursor_pagina_atual, renderizar_paginacao
+
+_POR_PAGINA = 100
 
 
 def renderizar_historico():
@@ -21,12 +26,18 @@ def renderizar_historico():
     with col3:
         filtro_resp = st.selectbox("Responsável", ["Todos"] + RESPONSAVEIS, key="hist_resp")
 
-    chamados = obter_historico()
+    filtros = {"data_inicio": data_inicio, "data_fim": data_fim, "responsavel": filtro_resp}
 
-    if not chamados:
+    total = contar_historico(**filtros)
+    if not total:
         st.info("Nenhum chamado resolvido encontrado.")
         return
 
+    cursor = cursor_pagina_atual("pag_historico", tuple(filtros.values()))
+    chamados, proximo = obter_historico_pagina(**filtros, cursor=cursor, limite=_POR_PAGINA)
+
+    st.markdown(f"**{total} chamado(s) resolvido(s) no período**")
+
     linhas = []
     for c in chamados:
         linhas.append({
@@ -39,12 +50,37 @@ def renderizar_historico():
 
     df_tabela = pd.DataFrame(linhas)
     st.dataframe(df_tabela, use_container_width=True, hide_index=True)
+    renderizar_paginacao("pag_historico", proximo)
+
+    # Export CSV: gerado sob demanda, lendo o banco em lotes (cursor server-side)
+    if st.button("📄 Gerar CSV", key="hist_gerar_csv"):
+        st.download_button(
+            "⬇️ Exportar CSV",
+            data=_gerar_csv(filtros),
+            file_name="historico_completo.csv",
+            mime="text/csv",
+        )
+
+
+def _gerar_csv(filtros) -> bytes:
+    """Monta o CSV lote a lote, sem carregar o histórico inteiro de uma vez do banco."""
+    arquivo = io.BytesIO()
+    arquivo.write(codecs.BOM_UTF8)
 
-    # Export CSV
-    csv = df_tabela.to_csv(index=False, sep=";", encoding="utf-8-sig")
-    st.download_button(
-        "⬇️ Exportar CSV",
-        data=csv,
-        file_name="historico_completo.csv",
-        mime="text/csv",
-    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    writer.writerow(["Cliente", "Título", "Responsável", "Abertura", "Resolução"])
+    for lote in iterar_historico(**filtros):
+        for cliente, titulo, responsavel, abertura, resolucao in lote:
+            writer.writerow([
+                cliente,
+                titulo,
+                responsavel,
+                formatar_data_br(abertura),
+                formatar_data_br(resolucao),
+            ])
+        arquivo.write(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+    arquivo.write(buffer.getvalue().encode("utf-8"))
+    return arquivo.getvalue()
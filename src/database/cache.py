@@ -0,0 +1,460 @@
+"""Cache de leituras compartilhado entre sessões, com versão por tabela.
+
+As funções de leitura de `operations.py` são decoradas com `leitor(*tabelas)`.
+O resultado fica guardado uma única vez por processo (via `st.cache_resource`)
+já convertido para uma forma compacta e somente leitura:
+
+    - listas de linhas viram tuplas de `Linha` (`__slots__`, colunas compartilhadas);
+    - dicionários viram `Linha`; listas aninhadas (json_agg) viram tuplas.
+
+Cada acerto devolve o mesmo objeto, sem pickle/unpickle por sessão. Cada
+tabela tem um contador de versão: `invalidar("chamados")` incrementa a versão
+e descarta as entradas que dependem dela. Uma entrada calculada enquanto a
+tabela mudava fica com a versão antiga e é recalculada no próximo acesso.
+
+Escritas de uma linha podem usar `corrigir()` em vez de `invalidar()`: as
+entradas afetadas recebem uma nova versão com a linha trocada (as demais
+linhas são reaproveitadas), e só o que não puder ser corrigido é descartado.
+
+Leitores com `delta` guardam uma marca d'água junto da entrada. Quando ela
+expira ou é invalidada, o cache pede só as linhas alteradas desde a marca e
+as mescla no snapshot, em vez de recarregar a lista inteira.
+
+Sessões que erram a mesma chave ao mesmo tempo esperam um único cálculo
+(single-flight); leitores com `revalidar=True` servem o valor vencido pelo
+TTL enquanto uma thread o atualiza (stale-while-revalidate).
+
+O cache é limitado: no máximo `CACHE_MAX_ENTRADAS` entradas e cerca de
+`CACHE_MAX_MB` MB (tamanho estimado dos snapshots); leitores com parâmetros
+podem ter um limite próprio (`max_entradas`). Ao passar do limite, saem as
+entradas usadas há mais tempo (LRU). `estatisticas()` dá, por função, os
+acertos, faltas e despejos.
+"""
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import Mapping
+
+import streamlit as st
+
+_MAX_ENTRADAS = int(os.environ.get("CACHE_MAX_ENTRADAS", "2000"))
+_MAX_BYTES = int(float(os.environ.get("CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+
+class Linha(Mapping):
+    """Linha somente leitura: acesso por nome como um dict, sem um dict por linha.
+
+    As linhas de um mesmo resultado compartilham o mapa coluna → posição.
+    """
+    __slots__ = ("_colunas", "_valores")
+
+    def __init__(self, colunas: dict, valores: tuple):
+        object.__setattr__(self, "_colunas", colunas)
+        object.__setattr__(self, "_valores", valores)
+
+    def __getitem__(self, chave):
+        return self._valores[self._colunas[chave]]
+
+    def __iter__(self):
+        return iter(self._colunas)
+
+    def __len__(self):
+        return len(self._valores)
+
+    def __contains__(self, chave):
+        return chave in self._colunas
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("Linha é somente leitura")
+
+    def __reduce__(self):
+        return (Linha, (self._colunas, self._valores))
+
+    def __repr__(self):
+        return f"Linha({dict(self)!r})"
+
+
+def congelar(valor, _colunas_por_chaves=None):
+    """Converte o retorno de uma leitura para a forma compacta e imutável."""
+    if _colunas_por_chaves is None:
+        _colunas_por_chaves = {}
+    if isinstance(valor, Linha):
+        return valor
+    if isinstance(valor, dict):
+        chaves = tuple(valor)
+        colunas = _colunas_por_chaves.get(chaves)
+        if colunas is None:
+            colunas = _colunas_por_chaves[chaves] = {c: i for i, c in enumerate(chaves)}
+        return Linha(colunas, tuple(congelar(v, _colunas_por_chaves) for v in valor.values()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(congelar(v, _colunas_por_chaves) for v in valor)
+    return valor
+
+
+def tamanho_estimado(valor) -> int:
+    """Bytes aproximados de um valor congelado (o mapa de colunas, compartilhado, não conta)."""
+    if isinstance(valor, Linha):
+        return (sys.getsizeof(valor) + sys.getsizeof(valor._valores)
+                + sum(tamanho_estimado(v) for v in valor._valores))
+    if isinstance(valor, tuple):
+        return sys.getsizeof(valor) + sum(tamanho_estimado(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class _Armazem:
+    """Entradas do cache e versões das tabelas, compartilhadas pelo processo."""
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.versoes = defaultdict(int)
+        # chave → (tabelas, versões no início do cálculo, instante, valor, marca d'água),
+        # da usada há mais tempo para a mais recente (LRU)
+        self.entradas = OrderedDict()
+        # chave → bytes estimados do valor; total de todas as entradas
+        self.tamanhos = {}
+        self.bytes = 0
+        # função → Counter(acertos, vencidas, faltas, esperas, deltas, despejos)
+        self.contadores = defaultdict(Counter)
+        # chave → _Voo dos cálculos em andamento (single-flight)
+        self.em_voo = {}
+
+    def versoes_de(self, tabelas):
+        return tuple(self.versoes[t] for t in tabelas)
+
+    # Os métodos abaixo supõem a trava já obtida
+
+    def guardar(self, chave, entrada, tamanho, max_entradas=None):
+        """Grava a entrada como a mais recente e despeja as mais antigas além dos limites."""
+        self.remover(chave)
+        self.entradas[chave] = entrada
+        self.tamanhos[chave] = tamanho
+        self.bytes += tamanho
+        if max_entradas is not None:
+            da_funcao = [c for c in self.entradas if c[0] == chave[0]]
+            for antiga in da_funcao[:max(0, len(da_funcao) - max_entradas)]:
+                self.despejar(antiga)
+        while len(self.entradas) > 1 and (
+                len(self.entradas) > _MAX_ENTRADAS or self.bytes > _MAX_BYTES):
+            self.despejar(next(iter(self.entradas)))
+
+    def remover(self, chave):
+        if self.entradas.pop(chave, None) is not None:
+            self.bytes -= self.tamanhos.pop(chave)
+
+    def despejar(self, chave):
+        self.remover(chave)
+        self.contadores[chave[0]]["despejos"] += 1
+
+
+@st.cache_resource
+def _armazem():
+    return _Armazem()
+
+
+# Tabela → funções de leitura que dependem dela
+LEITORES_POR_TABELA = defaultdict(list)
+
+# Leitores com atualização incremental: as entradas sobrevivem à invalidação
+# (ficam com versão antiga) para servirem de base ao delta
+_COM_DELTA = set()
+
+
+def _chave_argumentos(args, kwargs):
+    """Chave de cache a partir dos argumentos (listas viram tuplas)."""
+    def normalizar(v):
+        if isinstance(v, (list, set)):
+            return tuple(v)
+        return v
+    return (
+        tuple(normalizar(a) for a in args),
+        tuple(sorted((k, normalizar(v)) for k, v in kwargs.items())),
+    )
+
+
+class _Voo:
+    """Cálculo em andamento de uma chave; quem chega depois espera o resultado."""
+    __slots__ = ("versoes", "evento", "valor", "erro")
+
+    def __init__(self, versoes):
+        self.versoes = versoes
+        self.evento = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+def _voo_unico(armazem, chave, versoes, calcular):
+    """Executa `calcular` uma vez por chave e versão, mesmo com várias sessões pedindo juntas.
+
+    Quem chega enquanto outro calcula a mesma chave, nas mesmas versões das
+    tabelas, espera e recebe o mesmo resultado (ou a mesma exceção). Um
+    cálculo iniciado antes de uma invalidação não é reaproveitado.
+    """
+    with armazem.trava:
+        voo = armazem.em_voo.get(chave)
+        lider = voo is None or voo.versoes != versoes
+        if lider:
+            voo = armazem.em_voo[chave] = _Voo(versoes)
+        else:
+            armazem.contadores[chave[0]]["esperas"] += 1
+    if not lider:
+        voo.evento.wait()
+        if voo.erro is not None:
+            raise voo.erro
+        return voo.valor
+
+    try:
+        voo.valor = calcular()
+        return voo.valor
+    except BaseException as e:
+        voo.erro = e
+        raise
+    finally:
+        with armazem.trava:
+            if armazem.em_voo.get(chave) is voo:
+                del armazem.em_voo[chave]
+        voo.evento.set()
+
+
+def _revalidar_em_segundo_plano(armazem, chave, versoes, calcular):
+    """Dispara a atualização da chave numa thread, se ninguém já estiver calculando."""
+    with armazem.trava:
+        if chave in armazem.em_voo:
+            return
+
+    def rodar():
+        try:
+            _voo_unico(armazem, chave, versoes, calcular)
+        except Exception:
+            pass  # a entrada vencida continua servindo; o próximo acesso tenta de novo
+
+    threading.Thread(target=rodar, name=f"revalidar-{chave[0]}", daemon=True).start()
+
+
+def leitor(*tabelas, ttl: float = None, delta=None, marca=None, revalidar: bool = False,
+           max_entradas: int = None):
+    """Decora uma função de leitura com o cache compartilhado.
+
+    `tabelas` são as tabelas lidas (as escritas nelas invalidam o resultado);
+    `ttl` em segundos limita a idade da entrada mesmo sem invalidação.
+    Com `delta(valor, parametros, marca) -> (novo valor, nova marca) | None`,
+    entradas vencidas são atualizadas incrementalmente; `marca()` dá a marca
+    d'água inicial, lida antes de cada carga completa.
+
+    Faltas simultâneas da mesma chave viram uma única consulta. Com
+    `revalidar=True`, uma entrada vencida só pelo TTL é servida na hora
+    enquanto uma thread a atualiza; após invalidação (escrita), a leitura
+    sempre espera o valor novo.
+
+    `max_entradas` limita as entradas desta função (uma por combinação de
+    argumentos); as usadas há mais tempo são despejadas.
+    """
+    def decorar(funcao):
+        nome = funcao.__qualname__
+        assinatura = inspect.signature(funcao)
+
+        def calcular(armazem, chave, versoes, args, kwargs):
+            """Atualiza a entrada (por delta, se possível, ou carga completa) e a devolve."""
+            with armazem.trava:
+                entrada = armazem.entradas.get(chave)
+            if delta is not None and entrada is not None and entrada[4] is not None:
+                parametros = assinatura.bind(*args, **kwargs)
+                parametros.apply_defaults()
+                try:
+                    resultado = delta(entrada[3], parametros.arguments, entrada[4])
+                except Exception:
+                    resultado = None
+                if resultado is not None:
+                    valor = congelar(resultado[0])
+                    tamanho = tamanho_estimado(valor)
+                    with armazem.trava:
+                        armazem.guardar(chave, (tabelas, versoes, time.monotonic(), valor, resultado[1]),
+                                        tamanho, max_entradas)
+                        armazem.contadores[nome]["deltas"] += 1
+                    return valor
+
+            marca_nova = marca() if delta is not None and marca is not None else None
+            valor = congelar(funcao(*args, **kwargs))
+            tamanho = tamanho_estimado(valor)
+            with armazem.trava:
+                armazem.guardar(chave, (tabelas, versoes, time.monotonic(), valor, marca_nova),
+                                tamanho, max_entradas)
+            return valor
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            armazem = _armazem()
+            chave = (nome, _chave_argumentos(args, kwargs))
+            with armazem.trava:
+                versoes = armazem.versoes_de(tabelas)
+                entrada = armazem.entradas.get(chave)
+                if entrada is not None:
+                    armazem.entradas.move_to_end(chave)
+                atual = entrada is not None and entrada[1] == versoes
+                fresca = atual and (ttl is None or time.monotonic() - entrada[2] < ttl)
+                servir_vencida = atual and not fresca and revalidar
+                armazem.contadores[nome][
+                    "acertos" if fresca else "vencidas" if servir_vencida else "faltas"] += 1
+            if fresca:
+                return entrada[3]
+            if servir_vencida:
+                _revalidar_em_segundo_plano(
+                    armazem, chave, versoes,
+                    lambda: calcular(armazem, chave, versoes, args, kwargs),
+                )
+                return entrada[3]
+
+            return _voo_unico(
+                armazem, chave, versoes,
+                lambda: calcular(armazem, chave, versoes, args, kwargs),
+            )
+
+        def limpar():
+            """Descarta as entradas desta função."""
+            armazem = _armazem()
+            with armazem.trava:
+                for chave in [c for c in armazem.entradas if c[0] == nome]:
+                    armazem.remover(chave)
+
+        envolvida.clear = limpar
+        envolvida.tabelas = tabelas
+        envolvida.assinatura = assinatura
+        if delta is not None:
+            _COM_DELTA.add(nome)
+        for tabela in tabelas:
+            LEITORES_POR_TABELA[tabela].append(envolvida)
+        return envolvida
+    return decorar
+
+
+def invalidar(*tabelas):
+    """Nova versão das tabelas informadas; sem argumentos, de todas."""
+    armazem = _armazem()
+    with armazem.trava:
+        if not tabelas:
+            tabelas = tuple(set(armazem.versoes) | set(LEITORES_POR_TABELA))
+        alteradas = set(tabelas)
+        for tabela in alteradas:
+            armazem.versoes[tabela] += 1
+        for chave in [c for c, e in armazem.entradas.items()
+                      if alteradas.intersection(e[0]) and c[0] not in _COM_DELTA]:
+            armazem.remover(chave)
+
+
+def corrigir(tabelas, correcoes: dict) -> int:
+    """Nova versão das `tabelas`, corrigindo as entradas em vez de descartá-las.
+
+    `correcoes` é {leitor: função(valor, parametros) -> novo valor ou None}, onde
+    `parametros` são os argumentos da entrada (com os padrões preenchidos).
+    Entradas de leitores sem correção, já desatualizadas, ou cuja correção
+    retorne None (ou falhe) são descartadas e recarregadas no próximo acesso
+    (as de leitores com delta ficam, desatualizadas, como base do delta).
+    Retorna quantas entradas foram corrigidas.
+    """
+    por_nome = {l.__qualname__: (l, f) for l, f in correcoes.items()}
+    armazem = _armazem()
+    corrigidas = 0
+    with armazem.trava:
+        alteradas = set(tabelas)
+        atuais = {}
+        for chave, (tabs, versoes, _, _, _) in armazem.entradas.items():
+            if alteradas.intersection(tabs):
+                atuais[chave] = versoes == armazem.versoes_de(tabs)
+        for tabela in alteradas:
+            armazem.versoes[tabela] += 1
+
+        for chave, atual in atuais.items():
+            tabs, _, criado_em, valor, marca_entrada = armazem.entradas[chave]
+            leitor_, correcao = por_nome.get(chave[0], (None, None))
+            novo = None
+            if atual and correcao is not None:
+                args, kwargs = chave[1]
+                try:
+                    parametros = leitor_.assinatura.bind(*args, **dict(kwargs))
+                    parametros.apply_defaults()
+                    novo = correcao(valor, parametros.arguments)
+                except Exception:
+                    novo = None
+            if novo is not None:
+                # mantém a posição LRU; o tamanho é reestimado para o orçamento de memória
+                novo = congelar(novo)
+                tamanho = tamanho_estimado(novo)
+                armazem.entradas[chave] = (
+                    tabs, armazem.versoes_de(tabs), criado_em, novo, marca_entrada,
+                )
+                armazem.bytes += tamanho - armazem.tamanhos[chave]
+                armazem.tamanhos[chave] = tamanho
+                corrigidas += 1
+            elif chave[0] not in _COM_DELTA:
+                armazem.remover(chave)
+    return corrigidas
+
+
+def estatisticas() -> dict:
+    """Uso do cache: totais e, por função, contadores, entradas e bytes estimados.
+
+    `vencidas` são leituras servidas vencidas pelo TTL (revalidadas em segundo
+    plano); `esperas`, faltas que aguardaram o cálculo de outra sessão;
+    `deltas`, atualizações incrementais no lugar de cargas completas.
+    """
+    armazem = _armazem()
+    with armazem.trava:
+        funcoes = {nome: dict(c) for nome, c in armazem.contadores.items()}
+        for chave in armazem.entradas:
+            f = funcoes.setdefault(chave[0], {})
+            f["entradas"] = f.get("entradas", 0) + 1
+            f["bytes"] = f.get("bytes", 0) + armazem.tamanhos[chave]
+        total_entradas = len(armazem.entradas)
+        total_bytes = armazem.bytes
+    for f in funcoes.values():
+        for campo in ("acertos", "vencidas", "faltas", "esperas", "deltas", "despejos",
+                      "entradas", "bytes"):
+            f.setdefault(campo, 0)
+        leituras = f["acertos"] + f["vencidas"] + f["faltas"]
+        f["taxa_acerto"] = round(100 * (f["acertos"] + f["vencidas"]) / leituras, 1) if leituras else None
+    return {
+        "entradas": total_entradas,
+        "max_entradas": _MAX_ENTRADAS,
+        "bytes": total_bytes,
+        "max_bytes": _MAX_BYTES,
+        "funcoes": funcoes,
+    }
+
+
+def zerar_estatisticas():
+    """Zera os contadores (as entradas continuam no cache)."""
+    armazem = _armazem()
+    with armazem.trava:
+        armazem.contadores.clear()
+
+
+def alterar(linha: Linha, campos) -> Linha:
+    """Cópia da linha com os `campos` trocados (campos que a linha não tem são ignorados)."""
+    valores = list(linha._valores)
+    for coluna, valor in campos.items():
+        posicao = linha._colunas.get(coluna)
+        if posicao is not None:
+            valores[posicao] = congelar(valor)
+    return Linha(linha._colunas, tuple(valores))
+
+
+def nova_linha(dados, modelo: Linha = None):
+    """Linha com as mesmas colunas de `modelo` (ou de `dados`, sem modelo); None se faltar coluna."""
+    if modelo is None:
+        return congelar(dict(dados))
+    try:
+        return Linha(modelo._colunas, tuple(congelar(dados[c]) for c in modelo._colunas))
+    except KeyError:
+        return None
+
+
+def inserir_ordenado(linhas: tuple, linha: Linha, chave, decrescente: bool = False) -> tuple:
+    """Insere `linha` em `linhas` (já ordenadas por `chave`) depois das de mesma chave."""
+    valor = chave(linha)
+    for i, outra in enumerate(linhas):
+        if (chave(outra) < valor) if decrescente else (chave(outra) > valor):
+            return linhas[:i] + (linha,) + linhas[i:]
+    return linhas + (linha,)
@@ -0,0 +1,145 @@
+"""Instrumentação das queries: latência por nome, linhas retornadas, espera
+por conexão no pool, log de queries lentas e tempo de renderização por página.
+
+Os dados ficam em memória, por processo, e são exibidos no painel de
+desempenho (`src/components/desempenho.py`).
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores (ms) dos baldes do histograma de latência; o último é infinito
+FAIXAS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+# Queries acima deste tempo (ms) vão para o log de lentas; ajustável por variável de ambiente
+LIMITE_LENTA_MS = float(os.environ.get("SLOW_QUERY_MS", "500"))
+
+_MAX_LENTAS = 200
+
+
+class _Histograma:
+    __slots__ = ("contagem", "total_ms", "max_ms", "faixas")
+
+    def __init__(self):
+        self.contagem = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.faixas = [0] * len(FAIXAS_MS)
+
+    def registrar(self, ms: float):
+        self.contagem += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        for i, limite in enumerate(FAIXAS_MS):
+            if ms <= limite:
+                self.faixas[i] += 1
+                break
+
+    def percentil(self, p: float) -> float:
+        """Aproximação pelo limite superior do balde que contém o percentil."""
+        if not self.contagem:
+            return 0.0
+        alvo = p * self.contagem
+        acumulado = 0
+        for limite, n in zip(FAIXAS_MS, self.faixas):
+            acumulado += n
+            if acumulado >= alvo:
+                return min(limite, self.max_ms)
+        return self.max_ms
+
+    def resumo(self) -> dict:
+        return {
+            "chamadas": self.contagem,
+            "media_ms": round(self.total_ms / self.contagem, 2) if self.contagem else 0.0,
+            "p50_ms": round(self.percentil(0.50), 2),
+            "p95_ms": round(self.percentil(0.95), 2),
+            "max_ms": round(self.max_ms, 2),
+            "faixas": {
+                ("+inf" if limite == float("inf") else f"<={limite}"): n
+                for limite, n in zip(FAIXAS_MS, self.faixas)
+            },
+        }
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._linhas = {}
+        self._erros = {}
+        self._espera_pool = _Histograma()
+        self._lentas = deque(maxlen=_MAX_LENTAS)
+        self._renders = {}
+        self._desde = datetime.now()
+
+    def registrar_query(self, nome: str, ms: float, linhas: int, sql: str, erro: bool = False):
+        with self._lock:
+            hist = self._queries.get(nome)
+            if hist is None:
+                hist = self._queries[nome] = _Histograma()
+                self._linhas[nome] = 0
+                self._erros[nome] = 0
+            hist.registrar(ms)
+            self._linhas[nome] += max(linhas, 0)
+            if erro:
+                self._erros[nome] += 1
+            if ms >= LIMITE_LENTA_MS:
+                self._lentas.append({
+                    "quando": datetime.now().isoformat(timespec="seconds"),
+                    "nome": nome,
+                    "ms": round(ms, 2),
+                    "linhas": linhas,
+                    "sql": " ".join(sql.split())[:500],
+                })
+        if ms >= LIMITE_LENTA_MS:
+            logger.warning("Query lenta (%s): %.1f ms, %s linha(s)", nome, ms, linhas)
+
+    def registrar_espera_pool(self, ms: float):
+        with self._lock:
+            self._espera_pool.registrar(ms)
+
+    def registrar_render(self, pagina: str, ms: float):
+        with self._lock:
+            hist = self._renders.get(pagina)
+            if hist is None:
+                hist = self._renders[pagina] = _Histograma()
+            hist.registrar(ms)
+
+    def resumo(self) -> dict:
+        with self._lock:
+            queries = {}
+            for nome, hist in self._queries.items():
+                dados = hist.resumo()
+                dados["linhas_total"] = self._linhas[nome]
+                dados["linhas_media"] = round(self._linhas[nome] / hist.contagem, 1) if hist.contagem else 0.0
+                dados["erros"] = self._erros[nome]
+                queries[nome] = dados
+            return {
+                "desde": self._desde.isoformat(timespec="seconds"),
+                "limite_lenta_ms": LIMITE_LENTA_MS,
+                "queries": queries,
+                "espera_pool": self._espera_pool.resumo(),
+                "lentas": list(self._lentas),
+                "renders": {pagina: hist.resumo() for pagina, hist in self._renders.items()},
+            }
+
+    def exportar_json(self) -> str:
+        return json.dumps(self.resumo(), ensure_ascii=False, indent=2)
+
+    def limpar(self):
+        with self._lock:
+            self._queries.clear()
+            self._linhas.clear()
+            self._erros.clear()
+            self._espera_pool = _Histograma()
+            self._lentas.clear()
+            self._renders.clear()
+            self._desde = datetime.now()
+
+
+metricas = Metricas()
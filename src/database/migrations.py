@@ -0,0 +1,215 @@
+"""Migrações versionadas do esquema do banco.
+
+Cada migração tem uma versão crescente e fica registrada em `schema_migrations`
+depois de aplicada. O app só confere a versão uma vez por processo
+(`operations.init_db`); as pendentes devem ser aplicadas no deploy:
+
+    python -m src.database.migrations            # aplica as pendentes
+    python -m src.database.migrations --status   # só lista o que falta
+"""
+import argparse
+import os
+import re
+import sys
+from collections import namedtuple
+
+import psycopg2
+
+from src.database.models import (
+    CRIAR_TABELAS,
+    CRIAR_INDICES,
+    CRIAR_CONTADORES,
+    CORRIGIR_CONTADORES,
+    CRIAR_NOTIFICACOES,
+    CRIAR_BUSCA_TEXTO,
+    CRIAR_INDICES_BUSCA,
+    CRIAR_BUSCA_CLIENTES,
+    CRIAR_INDICES_CONSULTAS,
+    CRIAR_ATUALIZACAO_INCREMENTAL,
+    CRIAR_INDICES_ATUALIZACAO,
+    CRIAR_INDICE_ORDEM_RESOLVIDOS,
+    REMOVER_MARCA_COBRANCAS,
+)
+
+# `transacional=False` roda os comandos em autocommit — necessário para
+# CREATE INDEX CONCURRENTLY, que não bloqueia escritas durante a criação.
+Migracao = namedtuple("Migracao", ["versao", "descricao", "comandos", "transacional"])
+
+CRIAR_TABELA_MIGRACOES = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        versao       INTEGER PRIMARY KEY,
+        descricao    TEXT NOT NULL,
+        aplicada_em  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Chave do advisory lock que serializa migrações entre réplicas/CLI
+_CHAVE_LOCK = 7_420_001
+
+_INDICE_CONCORRENTE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE,
+)
+
+MIGRACOES = [
+    Migracao(1, "Tabelas e índices base", CRIAR_TABELAS + CRIAR_INDICES, True),
+    Migracao(2, "Coluna clientes.status_implantacao", [
+        "ALTER TABLE clientes ADD COLUMN IF NOT EXISTS status_implantacao TEXT NOT NULL "
+        "DEFAULT '3. Novo cliente sem integração'",
+        "UPDATE clientes SET status_implantacao = '3. Novo cliente sem integração' "
+        "WHERE status_implantacao = 'Novo cliente'",
+    ], True),
+    Migracao(3, "Status 'Respondido' passa a 'Respondido - Em andamento'", [
+        "UPDATE chamados SET status = 'Respondido - Em andamento' WHERE status = 'Respondido'",
+    ], True),
+    Migracao(4, "Coluna chamados.titulo renomeada para observacao", [
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'chamados' AND column_name = 'titulo')
+               AND NOT EXISTS (SELECT 1 FROM information_schema.columns
+                               WHERE table_name = 'chamados' AND column_name = 'observacao') THEN
+                ALTER TABLE chamados RENAME COLUMN titulo TO observacao;
+            END IF;
+        END
+        $$
+        """,
+    ], True),
+    Migracao(5, "Contadores de KPI mantidos por gatilhos", CRIAR_CONTADORES, True),
+    Migracao(6, "Índice (status, data_resolucao) em chamados", [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chamados_status_resolucao "
+        "ON chamados(status, data_resolucao)",
+    ], False),
+    Migracao(7, "NOTIFY de invalidação de cache por tabela", CRIAR_NOTIFICACOES, True),
+    Migracao(8, "Colunas tsvector de busca textual", CRIAR_BUSCA_TEXTO, True),
+    Migracao(9, "Índices GIN da busca textual", CRIAR_INDICES_BUSCA, False),
+    Migracao(10, "pg_trgm e índice de trigramas em clientes.nome", CRIAR_BUSCA_CLIENTES, False),
+    Migracao(11, "Índices parciais e compostos para as consultas do app", CRIAR_INDICES_CONSULTAS, False),
+    Migracao(12, "Marca atualizado_em por gatilho e registro de exclusões", CRIAR_ATUALIZACAO_INCREMENTAL, True),
+    Migracao(13, "Índices em atualizado_em para a atualização incremental", CRIAR_INDICES_ATUALIZACAO, False),
+    Migracao(14, "Contadores de KPI: remove cobrancas_pendentes e reconta sob trava", CORRIGIR_CONTADORES, True),
+    Migracao(15, "Índice da ordem dos resolvidos (sem data de resolução no fim)", CRIAR_INDICE_ORDEM_RESOLVIDOS, False),
+    Migracao(16, "Remove gatilhos e índice de atualização incremental de cobranças", REMOVER_MARCA_COBRANCAS, False),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1].versao
+
+
+def versoes_aplicadas(conn) -> set:
+    """Versões já registradas em schema_migrations (vazio se a tabela não existir)."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return set()
+        cur.execute("SELECT versao FROM schema_migrations")
+        return {r[0] for r in cur.fetchall()}
+
+
+def _descartar_indice_invalido(cur, stmt):
+    """Remove o índice de um CREATE INDEX CONCURRENTLY IF NOT EXISTS que ficou
+    INVALID numa tentativa anterior (o IF NOT EXISTS o manteria quebrado)."""
+    m = _INDICE_CONCORRENTE.search(stmt)
+    if not m:
+        return
+    cur.execute(
+        """SELECT NOT i.indisvalid FROM pg_index i
+           WHERE i.indexrelid = to_regclass(%s)""",
+        (m.group(1),),
+    )
+    linha = cur.fetchone()
+    if linha and linha[0]:
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {m.group(1)}")
+
+
+def migracoes_pendentes(conn) -> list:
+    aplicadas = versoes_aplicadas(conn)
+    return [m for m in MIGRACOES if m.versao not in aplicadas]
+
+
+def aplicar_migracoes(dsn=None, saida=print) -> list:
+    """Aplica as migrações pendentes em ordem e retorna as versões aplicadas.
+
+    Usa uma conexão própria (fora do pool do app) e um advisory lock, de modo
+    que várias réplicas subindo ao mesmo tempo não apliquem a mesma migração.
+    """
+    conn = psycopg2.connect(dsn or os.environ.get("DATABASE_URL"))
+    conn.autocommit = True
+    aplicadas = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (_CHAVE_LOCK,))
+            cur.execute(CRIAR_TABELA_MIGRACOES)
+
+        for m in migracoes_pendentes(conn):
+            saida(f"Aplicando migração {m.versao}: {m.descricao}")
+            if m.transacional:
+                conn.autocommit = False
+                try:
+                    with conn.cursor() as cur:
+                        # Não fica esperando indefinidamente por locks de tabelas em uso
+                        cur.execute("SET LOCAL lock_timeout = '5s'")
+                        for stmt in m.comandos:
+                            cur.execute(stmt)
+                        cur.execute(
+                            "INSERT INTO schema_migrations (versao, descricao) VALUES (%s, %s)",
+                            (m.versao, m.descricao),
+                        )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.autocommit = True
+            else:
+                with conn.cursor() as cur:
+                    for stmt in m.comandos:
+                        _descartar_indice_invalido(cur, stmt)
+                        cur.execute(stmt)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (versao, descricao) VALUES (%s, %s)",
+                        (m.versao, m.descricao),
+                    )
+            aplicadas.append(m.versao)
+    finally:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (_CHAVE_LOCK,))
+        finally:
+            conn.close()
+    return aplicadas
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    p = argparse.ArgumentParser(description="Aplica as migrações pendentes do esquema")
+    p.add_argument("--status", action="store_true", help="Apenas lista as migrações pendentes")
+    args = p.parse_args()
+
+    try:
+        if args.status:
+            conn = psycopg2.connect(os.environ.get("DATABASE_URL"))
+            try:
+                pendentes = migracoes_pendentes(conn)
+            finally:
+                conn.close()
+            if not pendentes:
+                print(f"Esquema atualizado (versão {VERSAO_ATUAL}).")
+            for m in pendentes:
+                print(f"Pendente {m.versao}: {m.descricao}")
+            return
+
+        aplicadas = aplicar_migracoes()
+        if aplicadas:
+            print(f"{len(aplicadas)} migração(ões) aplicada(s).")
+        else:
+            print(f"Nada a aplicar (versão {VERSAO_ATUAL}).")
+    except Exception as e:
+        print(f"Erro ao aplicar migrações: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -60,3 +60,240 @@ CRIAR_INDICES = [
     "CREATE INDEX IF NOT EXISTS idx_cobrancas_chamado    ON cobrancas(chamado_id)",
     "CREATE INDEX IF NOT EXISTS idx_checklist_cliente    ON checklist(cliente_id)",
 ]
+
+# Índices ajustados às consultas do app (parciais e compostos). Criados com
+# CONCURRENTLY, numa migração não transacional:
+#   - chamados abertos:      WHERE status != 'Resolvido' ORDER BY data_abertura
+#   - cobranças pendentes:   WHERE respondido = 0 ORDER BY data_envio, id
+#   - cobranças do chamado:  WHERE chamado_id = ? ORDER BY data_envio
+#   - clientes ativos:       WHERE ativo = 1 ORDER BY nome
+# (chamado_id, data_envio) torna idx_cobrancas_chamado redundante.
+CRIAR_INDICES_CONSULTAS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chamados_abertos "
+    "ON chamados(data_abertura) WHERE status <> 'Resolvido'",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cobrancas_pendentes "
+    "ON cobrancas(data_envio, id) WHERE respondido = 0",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cobrancas_chamado_envio "
+    "ON cobrancas(chamado_id, data_envio)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_ativo_nome "
+    "ON clientes(ativo, nome)",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_cobrancas_chamado",
+]
+
+# Contagem completa dos contadores de KPI (carga inicial e recontagem)
+_CONTAGEM_KPI = """
+    SELECT 'total_abertos' AS chave, COUNT(*) FILTER (WHERE status != 'Resolvido') AS valor FROM chamados
+    UNION ALL
+    SELECT 'aguardando_cliente', COUNT(*) FILTER (WHERE status = 'Aguardando cliente')  FROM chamados
+    UNION ALL
+    SELECT 'total_resolvidos',   COUNT(*) FILTER (WHERE status = 'Resolvido')           FROM chamados
+    UNION ALL
+    SELECT 'total_geral',        COUNT(*)                                               FROM chamados
+"""
+
+# Contadores de KPI mantidos por gatilhos: a barra lateral e o dashboard leem
+# valores prontos em vez de varrer chamados a cada expiração do cache. A tabela
+# fica travada contra escritas da contagem até o commit (com o gatilho já
+# criado), para nenhuma alteração escapar entre a carga e o gatilho.
+CRIAR_CONTADORES = [
+    """
+    CREATE TABLE IF NOT EXISTS kpi_counters (
+        chave  TEXT PRIMARY KEY,
+        valor  BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+    "LOCK TABLE chamados IN SHARE ROW EXCLUSIVE MODE",
+    # Carga inicial (só grava se o contador ainda não existir)
+    f"""
+    INSERT INTO kpi_counters (chave, valor)
+    {_CONTAGEM_KPI}
+    ON CONFLICT (chave) DO NOTHING
+    """,
+    """
+    CREATE OR REPLACE FUNCTION kpi_chamados_atualizar() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND OLD.status IS NOT DISTINCT FROM NEW.status THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE kpi_counters SET valor = valor - CASE chave
+                WHEN 'total_abertos'      THEN (OLD.status != 'Resolvido')::int
+                WHEN 'aguardando_cliente' THEN (OLD.status = 'Aguardando cliente')::int
+                WHEN 'total_resolvidos'   THEN (OLD.status = 'Resolvido')::int
+                WHEN 'total_geral'        THEN (TG_OP = 'DELETE')::int
+            END
+            WHERE chave IN ('total_abertos', 'aguardando_cliente', 'total_resolvidos', 'total_geral');
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE kpi_counters SET valor = valor + CASE chave
+                WHEN 'total_abertos'      THEN (NEW.status != 'Resolvido')::int
+                WHEN 'aguardando_cliente' THEN (NEW.status = 'Aguardando cliente')::int
+                WHEN 'total_resolvidos'   THEN (NEW.status = 'Resolvido')::int
+                WHEN 'total_geral'        THEN (TG_OP = 'INSERT')::int
+            END
+            WHERE chave IN ('total_abertos', 'aguardando_cliente', 'total_resolvidos', 'total_geral');
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_kpi_chamados ON chamados",
+    """
+    CREATE TRIGGER trg_kpi_chamados
+    AFTER INSERT OR UPDATE OF status OR DELETE ON chamados
+    FOR EACH ROW EXECUTE FUNCTION kpi_chamados_atualizar()
+    """,
+]
+
+# Remove o contador de cobranças pendentes (nunca lido: o resumo da aba de
+# cobranças conta as atrasadas, que dependem do dia) e reconta os de chamados
+# sob trava, corrigindo escritas perdidas na carga inicial.
+CORRIGIR_CONTADORES = [
+    "LOCK TABLE chamados IN SHARE ROW EXCLUSIVE MODE",
+    "DROP TRIGGER IF EXISTS trg_kpi_cobrancas ON cobrancas",
+    "DROP FUNCTION IF EXISTS kpi_cobrancas_atualizar()",
+    "DELETE FROM kpi_counters WHERE chave = 'cobrancas_pendentes'",
+    f"""
+    INSERT INTO kpi_counters (chave, valor)
+    {_CONTAGEM_KPI}
+    ON CONFLICT (chave) DO UPDATE SET valor = EXCLUDED.valor
+    """,
+]
+
+# Tabelas cujas alterações invalidam o cache de leitura do app
+TABELAS_NOTIFICADAS = ["clientes", "chamados", "cobrancas", "checklist"]
+
+# Notificação de invalidação de cache: cada comando que altera uma das tabelas
+# acima emite NOTIFY no canal cache_<tabela>, com o application_name da conexão
+# de origem como payload (assim cada processo ignora as próprias escritas).
+CRIAR_NOTIFICACOES = [
+    """
+    CREATE OR REPLACE FUNCTION notificar_alteracao() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('cache_' || TG_TABLE_NAME, current_setting('application_name'));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+] + [
+    comando
+    for tabela in TABELAS_NOTIFICADAS
+    for comando in (
+        f"DROP TRIGGER IF EXISTS trg_notificar_{tabela} ON {tabela}",
+        f"""
+        CREATE TRIGGER trg_notificar_{tabela}
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabela}
+        FOR EACH STATEMENT EXECUTE FUNCTION notificar_alteracao()
+        """,
+    )
+]
+
+# Busca textual em português: coluna tsvector gerada (mantida pelo próprio
+# Postgres a cada INSERT/UPDATE) em chamados e cobranças. O texto passa por
+# sem_acentos() para que "divergencia" encontre "divergência"; a mesma função
+# é aplicada ao termo buscado. Os pesos priorizam o título (observacao).
+CRIAR_BUSCA_TEXTO = [
+    """
+    CREATE OR REPLACE FUNCTION sem_acentos(texto TEXT) RETURNS TEXT AS $$
+        SELECT translate(texto,
+                         'áàâãäéèêëíìîïóòôõöúùûüçÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇ',
+                         'aaaaaeeeeiiiiooooouuuucAAAAAEEEEIIIIOOOOOUUUUC')
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """,
+    """
+    ALTER TABLE chamados ADD COLUMN IF NOT EXISTS busca tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', sem_acentos(coalesce(observacao, ''))), 'A') ||
+        setweight(to_tsvector('portuguese', sem_acentos(coalesce(descricao, ''))), 'B') ||
+        setweight(to_tsvector('portuguese', sem_acentos(coalesce(resolucao, ''))), 'C')
+    ) STORED
+    """,
+    """
+    ALTER TABLE cobrancas ADD COLUMN IF NOT EXISTS busca tsvector GENERATED ALWAYS AS (
+        to_tsvector('portuguese', sem_acentos(coalesce(mensagem, '') || ' ' || coalesce(resposta_cliente, '')))
+    ) STORED
+    """,
+]
+
+# Criados com CONCURRENTLY (migração não transacional) para não travar escritas
+CRIAR_INDICES_BUSCA = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chamados_busca ON chamados USING GIN (busca)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cobrancas_busca ON cobrancas USING GIN (busca)",
+]
+
+# Busca aproximada de clientes por nome (pg_trgm). O índice GIN de trigramas
+# atende tanto aos operadores de similaridade quanto a ILIKE '%termo%'.
+CRIAR_BUSCA_CLIENTES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_clientes_nome_trgm "
+    "ON clientes USING GIN (sem_acentos(nome) gin_trgm_ops)",
+]
+
+# Atualização incremental do cache: toda alteração em clientes e chamados (as
+# tabelas das listagens com delta) carimba atualizado_em (gatilho, vale também
+# para scripts e outras réplicas), e exclusões deixam uma marca em `exclusoes`,
+# limpa periodicamente.
+TABELAS_COM_MARCA = ["clientes", "chamados"]
+
+CRIAR_ATUALIZACAO_INCREMENTAL = [
+    "ALTER TABLE cobrancas ADD COLUMN IF NOT EXISTS atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+    """
+    CREATE OR REPLACE FUNCTION marcar_atualizacao() RETURNS trigger AS $$
+    BEGIN
+        NEW.atualizado_em := CURRENT_TIMESTAMP;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS exclusoes (
+        tabela       TEXT NOT NULL,
+        registro_id  INTEGER NOT NULL,
+        excluido_em  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_exclusoes_excluido_em ON exclusoes(excluido_em)",
+    """
+    CREATE OR REPLACE FUNCTION registrar_exclusao() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO exclusoes (tabela, registro_id) VALUES (TG_TABLE_NAME, OLD.id);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+] + [
+    comando
+    for tabela in TABELAS_COM_MARCA
+    for comando in (
+        f"DROP TRIGGER IF EXISTS trg_marcar_{tabela} ON {tabela}",
+        f"""
+        CREATE TRIGGER trg_marcar_{tabela}
+        BEFORE UPDATE ON {tabela}
+        FOR EACH ROW EXECUTE FUNCTION marcar_atualizacao()
+        """,
+        f"DROP TRIGGER IF EXISTS trg_exclusao_{tabela} ON {tabela}",
+        f"""
+        CREATE TRIGGER trg_exclusao_{tabela}
+        AFTER DELETE ON {tabela}
+        FOR EACH ROW EXECUTE FUNCTION registrar_exclusao()
+        """,
+    )
+]
+
+CRIAR_INDICES_ATUALIZACAO = [
+    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_{tabela}_atualizado_em ON {tabela}(atualizado_em)"
+    for tabela in TABELAS_COM_MARCA
+]
+
+# Cobranças não têm mais listagem com delta: sem gatilhos, marcas nem índice
+REMOVER_MARCA_COBRANCAS = [
+    "DROP TRIGGER IF EXISTS trg_exclusao_cobrancas ON cobrancas",
+    "DROP TRIGGER IF EXISTS trg_marcar_cobrancas ON cobrancas",
+    "DELETE FROM exclusoes WHERE tabela = 'cobrancas'",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_cobrancas_atualizado_em",
+]
+
+# Ordem das listagens de resolvidos (keyset), com os sem data de resolução no fim
+CRIAR_INDICE_ORDEM_RESOLVIDOS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chamados_resolvidos_ordem "
+    "ON chamados ((COALESCE(data_resolucao, DATE '0001-01-01')), id) WHERE status = 'Resolvido'",
+]
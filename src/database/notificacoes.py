@@ -0,0 +1,76 @@
+"""Invalidação de cache entre réplicas via LISTEN/NOTIFY do Postgres.
+
+Os gatilhos criados por `models.CRIAR_NOTIFICACOES` emitem NOTIFY no canal
+`cache_<tabela>` a cada escrita. Cada processo do app mantém uma thread que
+escuta esses canais em uma conexão dedicada (fora do pool) e repassa as
+tabelas alteradas para a função de invalidação.
+"""
+import logging
+import select
+import threading
+import time
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_CANAL = "cache_"
+
+
+class OuvinteInvalidacao(threading.Thread):
+    """Thread que escuta os canais de invalidação e chama `ao_notificar(tabelas)`.
+
+    Notificações cujo payload é igual a `origem` (o application_name das
+    conexões deste processo) são ignoradas, pois o próprio processo já limpou
+    o cache ao escrever. Se a conexão cair, reconecta com espera crescente e,
+    como notificações podem ter sido perdidas, chama `ao_notificar(None)`
+    para limpar tudo.
+    """
+
+    def __init__(self, dsn: str, tabelas, ao_notificar, origem: str):
+        super().__init__(name="ouvinte-invalidacao-cache", daemon=True)
+        self.dsn = dsn
+        self.tabelas = list(tabelas)
+        self.ao_notificar = ao_notificar
+        self.origem = origem
+
+    def run(self):
+        espera = 1
+        reconexao = False
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn, application_name=f"{self.origem}-ouvinte")
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    for tabela in self.tabelas:
+                        cur.execute(f"LISTEN {PREFIXO_CANAL}{tabela}")
+                if reconexao:
+                    self.ao_notificar(None)
+                espera = 1
+                self._escutar(conn)
+            except Exception as e:
+                logger.warning("Ouvinte de invalidação desconectado (%s); nova tentativa em %ss", e, espera)
+            finally:
+                if conn is not None:
+                    conn.close()
+            reconexao = True
+            time.sleep(espera)
+            espera = min(espera * 2, 60)
+
+    def _escutar(self, conn):
+        while True:
+            # Acorda periodicamente para detectar conexões mortas; o SELECT 1
+            # também lê notificações que chegaram junto, tratadas abaixo
+            if select.select([conn], [], [], 30) == ([], [], []):
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            else:
+                conn.poll()
+            tabelas = set()
+            while conn.notifies:
+                n = conn.notifies.pop(0)
+                if n.payload != self.origem:
+                    tabelas.add(n.channel[len(PREFIXO_CANAL):])
+            if tabelas:
+                self.ao_notificar(tabelas)
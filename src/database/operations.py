@@ -1,109 +1,316 @@
 import os
+import sys
+import time
 import psycopg2
 import psycopg2.extras
 import psycopg2.pool
+import threading
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from datetime import date
-
-from src.database.models import CRIAR_TABELAS, CRIAR_INDICES
+from datetime import date, timedelta
+from uuid import uuid4
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from src.database.cache import leitor, invalidar, corrigir, alterar, nova_linha, inserir_ordenado
+from src.database.metricas import metricas
+from src.database.migrations import migracoes_pendentes, aplicar_migracoes
+from src.database.models import TABELAS_NOTIFICADAS
+from src.database.notificacoes import OuvinteInvalidacao
 from src.utils.constants import MODULOS_CHECKLIST, CATEGORIAS
 
 
-def _invalidar_cache():
-    """Limpa o cache de todas as funções de leitura após uma escrita."""
-    listar_clientes.clear()
-    listar_chamados_abertos.clear()
-    listar_chamados_resolvidos.clear()
-    listar_todos_chamados.clear()
-    obter_estatisticas.clear()
-    obter_checklist_completo.clear()
-    listar_todas_cobrancas.clear()
-    listar_cobrancas_por_chamado.clear()
-    obter_historico.clear()
+# Com o ouvinte de NOTIFY ativo, escritas de qualquer réplica invalidam o cache
+# na hora, e o TTL serve só como rede de segurança. Sem ele (CACHE_NOTIFY=0,
+# ex.: pooler em modo transação, que não suporta LISTEN), volta aos 30 s.
+_OUVIR_NOTIFICACOES = os.environ.get("CACHE_NOTIFY", "1") != "0"
+_TTL_CACHE = int(os.environ.get("CACHE_TTL", "600" if _OUVIR_NOTIFICACOES else "30"))
+
+# Identifica as conexões deste processo (application_name), para que o ouvinte
+# ignore as notificações geradas pelas próprias escritas
+_ORIGEM = f"gestao-{os.getpid()}-{uuid4().hex[:8]}"
+
+# Atualização incremental das listagens: relê linhas alteradas desde a marca
+# d'água menos uma margem (cobre transações que gravaram atualizado_em antes
+# de a marca ser lida, mas só confirmaram depois). As marcas de exclusão são
+# guardadas por um dia; marcas d'água mais antigas forçam recarga completa.
+_MARGEM_DELTA = timedelta(seconds=int(os.environ.get("CACHE_DELTA_MARGEM", "60")))
+_RETENCAO_EXCLUSOES = timedelta(days=1)
+_ultima_limpeza_exclusoes = 0.0
+
+def _leitor(*tabelas, delta=None, revalidar=False, max_entradas=None):
+    """Leitura em cache compartilhado (ver `cache.py`), invalidada por escritas nas tabelas.
+
+    `revalidar=True` serve o valor vencido pelo TTL e atualiza em segundo plano;
+    use nas leituras que toda sessão faz a cada rerun. `max_entradas` limita as
+    combinações de argumentos guardadas (leituras com filtros ou por id).
+    """
+    return leitor(*tabelas, ttl=_TTL_CACHE, delta=delta, marca=_marca_dagua,
+                  revalidar=revalidar, max_entradas=max_entradas)
+
+
+def _invalidar_cache(*tabelas):
+    """Invalida as leituras que dependem das tabelas alteradas; sem argumentos, todas."""
+    invalidar(*tabelas)
+
+
+# Tamanho máximo do pool. O semáforo faz quem exceder esperar por uma conexão
+# livre em vez de receber PoolError (ThreadedConnectionPool não bloqueia)
+_MAX_CONEXOES = int(os.environ.get("DB_POOL_MAX", "10"))
+_VAGAS_POOL = threading.BoundedSemaphore(_MAX_CONEXOES)
+
+# Máximo de queries simultâneas de uma mesma chamada a executar_em_paralelo,
+# deixando conexões livres para as outras sessões
+_MAX_PARALELO = max(1, min(4, _MAX_CONEXOES // 2))
 
 
 @st.cache_resource
 def _get_pool():
     return psycopg2.pool.ThreadedConnectionPool(
         minconn=1,
-        maxconn=10,
+        maxconn=_MAX_CONEXOES,
         dsn=os.environ.get("DATABASE_URL"),
+        application_name=_ORIGEM,
     )
 
 
+def _ao_notificar(tabelas):
+    """Chamado pelo ouvinte de NOTIFY; `None` significa limpar tudo."""
+    if tabelas:
+        _invalidar_cache(*tabelas)
+    else:
+        _invalidar_cache()
+
+
+@st.cache_resource
+def _iniciar_ouvinte():
+    """Inicia (uma vez por processo) a thread que escuta as invalidações das outras réplicas.
+
+    Usa DATABASE_LISTEN_URL se definida — LISTEN exige conexão direta ou
+    pooler em modo sessão.
+    """
+    if not _OUVIR_NOTIFICACOES:
+        return None
+    dsn = os.environ.get("DATABASE_LISTEN_URL") or os.environ.get("DATABASE_URL")
+    ouvinte = OuvinteInvalidacao(dsn, TABELAS_NOTIFICADAS, _ao_notificar, _ORIGEM)
+    ouvinte.start()
+    return ouvinte
+
+
 @contextmanager
 def get_db():
     pool = _get_pool()
-    conn = pool.getconn()
+    inicio = time.perf_counter()
+    _VAGAS_POOL.acquire()
+    try:
+        conn = pool.getconn()
+    except BaseException:
+        _VAGAS_POOL.release()
+        raise
+    metricas.registrar_espera_pool((time.perf_counter() - inicio) * 1000)
     try:
         yield conn
         conn.commit()
-    except Exception:
+    except BaseException:
+        # BaseException: também desfaz quando um gerador (ex.: iterar_historico)
+        # é fechado antes de terminar
         conn.rollback()
         raise
     finally:
         pool.putconn(conn)
+        _VAGAS_POOL.release()
+
+
+def executar_em_paralelo(tarefas: dict) -> dict:
+    """Executa leituras independentes ao mesmo tempo, cada uma com sua conexão do pool.
+
+    `tarefas` é {nome: função} ou {nome: (função, arg1, ...)}; retorna
+    {nome: resultado}. Se alguma falhar, a exceção é repassada. As threads
+    herdam o contexto do script do Streamlit, então funções com cache podem
+    ser chamadas normalmente.
+    """
+    if not tarefas:
+        return {}
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def rodar(funcao, *args):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return funcao(*args)
+
+    chamadas = {
+        nome: tarefa if isinstance(tarefa, tuple) else (tarefa,)
+        for nome, tarefa in tarefas.items()
+    }
+    with ThreadPoolExecutor(max_workers=min(_MAX_PARALELO, len(chamadas))) as executor:
+        futuros = {nome: executor.submit(rodar, *chamada) for nome, chamada in chamadas.items()}
+        return {nome: futuro.result() for nome, futuro in futuros.items()}
+
 
+def _exec(conn, sql, params=None, nome=None):
+    """Executa uma query usando RealDictCursor e retorna o cursor.
 
-def _exec(conn, sql, params=None):
-    """Executa uma query usando RealDictCursor e retorna o cursor."""
+    Tempo e número de linhas vão para `metricas`, agrupados por `nome`
+    (por padrão, o nome da função que chamou _exec).
+    """
+    nome = nome or sys._getframe(1).f_code.co_name
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    cur.execute(sql, params)
+    inicio = time.perf_counter()
+    try:
+        cur.execute(sql, params)
+    except Exception:
+        metricas.registrar_query(nome, (time.perf_counter() - inicio) * 1000, -1, sql, erro=True)
+        raise
+    metricas.registrar_query(nome, (time.perf_counter() - inicio) * 1000, cur.rowcount, sql)
     return cur
 
 
-def init_db():
+def _exec_em_lotes(conn, sql, params=None, tamanho_lote: int = 2000, nome=None):
+    """Executa a query em um cursor nomeado (server-side) e gera lotes de tuplas.
+
+    Registra em `metricas` o tempo gasto no banco (sem contar o consumidor) e o
+    total de linhas lidas.
+    """
+    nome = nome or sys._getframe(1).f_code.co_name
+    cur = conn.cursor(name=f"lotes_{id(conn)}")
+    cur.itersize = tamanho_lote
+    gasto = 0.0
+    linhas = 0
+    try:
+        inicio = time.perf_counter()
+        cur.execute(sql, params)
+        while True:
+            lote = cur.fetchmany(tamanho_lote)
+            gasto += time.perf_counter() - inicio
+            if not lote:
+                break
+            linhas += len(lote)
+            yield lote
+            inicio = time.perf_counter()
+    finally:
+        cur.close()
+        metricas.registrar_query(nome, gasto * 1000, linhas, sql)
+
+
+def _paginar(linhas, limite, ordem):
+    """Corta `limite` linhas e devolve (página, cursor da próxima página ou None).
+
+    A query deve ter buscado `limite + 1` linhas; o cursor é `ordem(linha)` da
+    última linha da página: os valores do ORDER BY, na mesma ordem.
+    """
+    if len(linhas) <= limite:
+        return linhas, None
+    pagina = linhas[:limite]
+    return pagina, ordem(pagina[-1])
+
+
+def _padrao_contem(texto):
+    """Padrão ILIKE '%texto%' com os curingas do próprio texto escapados."""
+    escapado = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escapado}%"
+
+
+def _marca_dagua():
+    """Horário atual do banco: marca d'água das listagens com atualização incremental."""
     with get_db() as conn:
-        for stmt in CRIAR_TABELAS:
-            _exec(conn, stmt)
-        for stmt in CRIAR_INDICES:
-            _exec(conn, stmt)
+        return _exec(conn, "SELECT LOCALTIMESTAMP AS agora").fetchone()["agora"]
 
-        # Migração: adiciona coluna status_implantacao se ainda não existir
-        col = _exec(
-            conn,
-            """SELECT column_name FROM information_schema.columns
-               WHERE table_name = 'clientes' AND column_name = 'status_implantacao'"""
-        )
-        if not col.fetchone():
-            _exec(
-                conn,
-                "ALTER TABLE clientes ADD COLUMN status_implantacao TEXT NOT NULL "
-                "DEFAULT '3. Novo cliente sem integração'"
-            )
 
-        # Normaliza registros antigos
-        _exec(
-            conn,
-            "UPDATE clientes SET status_implantacao = '3. Novo cliente sem integração' "
-            "WHERE status_implantacao = 'Novo cliente'"
-        )
+def _aplicar_delta(valor, sql, parametros, marca, exclusoes, pertence, ordem, decrescente, nome,
+                   sql_ordem=None):
+    """Mescla numa listagem em cache as linhas alteradas e excluídas desde `marca`.
 
-        # Migração: renomear status 'Respondido' para 'Respondido - Em andamento'
+    `sql` usa %(desde)s e devolve as linhas alteradas no formato da listagem,
+    sem o filtro dela; `pertence(linha, parametros)` decide se a linha fica.
+    `exclusoes` é {tabela: coluna da linha com o id daquela tabela}.
+    Para ordens que dependem da collation do banco (nomes), `sql_ordem` devolve
+    só os ids da listagem já ordenados, no lugar de `ordem`, quando há alteradas.
+    Retorna (linhas, nova marca), ou None quando é preciso recarregar tudo
+    (marca fora da retenção ou virada do dia, que muda colunas calculadas).
+    """
+    with get_db() as conn:
+        agora = _exec(conn, "SELECT LOCALTIMESTAMP AS agora", nome=nome).fetchone()["agora"]
+        if agora - marca > _RETENCAO_EXCLUSOES or agora.date() != marca.date():
+            return None
+        desde = marca - _MARGEM_DELTA
+        alteradas = _exec(conn, sql, {**parametros, "desde": desde}, nome=nome).fetchall()
+        excluidas = _exec(
+            conn,
+            "SELECT tabela, registro_id FROM exclusoes WHERE excluido_em > %s AND tabela = ANY(%s)",
+            (desde, list(exclusoes)),
+            nome=nome,
+        ).fetchall()
+        if alteradas and sql_ordem:
+            ids = _exec(conn, sql_ordem, parametros, nome=nome).fetchall()
+            posicoes = {l["id"]: i for i, l in enumerate(ids)}
+
+            def ordem(linha):
+                return posicoes.get(linha["id"], len(posicoes))
+    _limpar_exclusoes()
+
+    if not alteradas and not excluidas:
+        return valor, agora
+    fora = {(e["tabela"], e["registro_id"]) for e in excluidas}
+    ids_alterados = {l["id"] for l in alteradas}
+    mantidas = [
+        l for l in valor
+        if l["id"] not in ids_alterados
+        and not any((tabela, l[coluna]) in fora for tabela, coluna in exclusoes.items())
+    ]
+    modelo = valor[0] if valor else None
+    novas = [nova_linha(l, modelo) for l in alteradas if pertence(l, parametros)]
+    if any(l is None for l in novas):
+        return None
+    # Sem linhas novas, as mantidas já estão na ordem da listagem
+    if not novas:
+        return tuple(mantidas), agora
+    return tuple(sorted(mantidas + novas, key=ordem, reverse=decrescente)), agora
+
+
+def _limpar_exclusoes():
+    """Apaga marcas de exclusão vencidas (no máximo uma vez por hora por processo)."""
+    global _ultima_limpeza_exclusoes
+    if time.monotonic() - _ultima_limpeza_exclusoes < 3600:
+        return
+    _ultima_limpeza_exclusoes = time.monotonic()
+    with get_db() as conn:
         _exec(
             conn,
-            "UPDATE chamados SET status = 'Respondido - Em andamento' WHERE status = 'Respondido'"
+            "DELETE FROM exclusoes WHERE excluido_em < LOCALTIMESTAMP - %s",
+            (_RETENCAO_EXCLUSOES,),
         )
 
-        # Migração: renomear coluna 'titulo' para 'observacao' em chamados se necessário
-        obs = _exec(
-            conn,
-            """SELECT column_name FROM information_schema.columns
-               WHERE table_name = 'chamados' AND column_name = 'observacao'"""
-        )
-        tit = _exec(
-            conn,
-            """SELECT column_name FROM information_schema.columns
-               WHERE table_name = 'chamados' AND column_name = 'titulo'"""
-        )
-        if not obs.fetchone() and tit.fetchone():
-            _exec(conn, "ALTER TABLE chamados RENAME COLUMN titulo TO observacao")
+
+@st.cache_resource
+def init_db():
+    """Confere a versão do esquema uma vez por processo.
+
+    Em operação normal as migrações já foram aplicadas no deploy
+    (`python -m src.database.migrations`) e isto custa uma única query. Se
+    houver pendências (ex.: banco novo), elas são aplicadas aqui.
+    """
+    with get_db() as conn:
+        pendentes = migracoes_pendentes(conn)
+    if pendentes:
+        aplicar_migracoes(os.environ.get("DATABASE_URL"))
+        _invalidar_cache()
+    _iniciar_ouvinte()
 
 
 # ─── CLIENTES ────────────────────────────────────────────────────────────────
 
-@st.cache_data(ttl=30)
+def _delta_clientes(valor, parametros, marca):
+    # A ordem por nome segue a collation do banco: vem dele, só com os ids
+    return _aplicar_delta(
+        valor, "SELECT * FROM clientes WHERE atualizado_em > %(desde)s", parametros, marca,
+        {"clientes": "id"},
+        lambda l, p: not p["apenas_ativos"] or l["ativo"] == 1, None, False,
+        "delta_clientes",
+        sql_ordem="SELECT id FROM clientes WHERE ativo = 1 OR NOT %(apenas_ativos)s ORDER BY nome",
+    )
+
+
+@_leitor("clientes", revalidar=True, delta=_delta_clientes)
 def listar_clientes(apenas_ativos: bool = True):
     with get_db() as conn:
         if apenas_ativos:
@@ -113,24 +320,121 @@ def listar_clientes(apenas_ativos: bool = True):
         return cur.fetchall()
 
 
+@_leitor("clientes", max_entradas=100)
+def buscar_clientes(termo: str = "", limite: int = 20, apenas_ativos: bool = True):
+    """Clientes cujo nome mais se parece com `termo`, do mais parecido ao menos.
+
+    Usa o índice de trigramas (pg_trgm) sobre o nome sem acentos: aceita
+    erros de digitação e trechos do nome. Cada linha traz `score` entre 0 e 1.
+    Sem termo, retorna os primeiros `limite` clientes em ordem alfabética.
+    """
+    termo = (termo or "").strip()
+    ativo = "ativo = 1" if apenas_ativos else "TRUE"
+    with get_db() as conn:
+        if not termo:
+            cur = _exec(
+                conn,
+                f"SELECT *, 1.0::real AS score FROM clientes WHERE {ativo} ORDER BY nome LIMIT %s",
+                (limite,),
+            )
+            return cur.fetchall()
+        cur = _exec(
+            conn,
+            f"""WITH t AS (SELECT sem_acentos(%s) AS termo, sem_acentos(%s) AS padrao)
+               SELECT cl.*,
+                      greatest(similarity(sem_acentos(cl.nome), t.termo),
+                               word_similarity(t.termo, sem_acentos(cl.nome))) AS score
+               FROM clientes cl, t
+               WHERE {ativo}
+                 AND (t.termo <%% sem_acentos(cl.nome)
+                      OR sem_acentos(cl.nome) ILIKE t.padrao)
+               ORDER BY score DESC, cl.nome
+               LIMIT %s""",
+            (termo, _padrao_contem(termo), limite),
+        )
+        return cur.fetchall()
+
+
+def cliente_mais_parecido(nome: str, minimo: float, apenas_ativos: bool = False):
+    """Cliente cujo nome inteiro é o mais parecido com `nome` (similaridade ≥ `minimo`), ou None.
+
+    Para apontar possíveis duplicatas em importações: usa só a similaridade simétrica de trigramas,
+    sem `word_similarity`, para que "ACME" não case com "ACME Filial Norte".
+    """
+    ativo = "ativo = 1" if apenas_ativos else "TRUE"
+    with get_db() as conn:
+        cur = _exec(
+            conn,
+            f"""WITH t AS (SELECT sem_acentos(%s) AS termo)
+               SELECT cl.*, similarity(sem_acentos(cl.nome), t.termo) AS score
+               FROM clientes cl, t
+               WHERE {ativo}
+                 AND sem_acentos(cl.nome) %% t.termo
+                 AND similarity(sem_acentos(cl.nome), t.termo) >= %s
+               ORDER BY score DESC, cl.nome
+               LIMIT 1""",
+            ((nome or "").strip(), minimo),
+        )
+        return cur.fetchone()
+
+
 def adicionar_cliente(nome: str, responsavel: str, status_implantacao: str = "3. Novo cliente sem integração") -> int:
+    # Cliente e checklist inicial (todos os módulos 'ok') em uma única query
     with get_db() as conn:
         cur = _exec(
             conn,
-            "INSERT INTO clientes (nome, responsavel, status_implantacao) VALUES (%s, %s, %s) RETURNING id",
-            (nome.strip(), responsavel, status_implantacao),
+            """WITH novo AS (
+                   INSERT INTO clientes (nome, responsavel, status_implantacao)
+                   VALUES (%s, %s, %s)
+                   RETURNING id
+               ), checklist_inicial AS (
+                   INSERT INTO checklist (cliente_id, modulo, status)
+                   SELECT novo.id, m.modulo, 'ok'
+                   FROM novo, unnest(%s::text[]) AS m(modulo)
+                   ON CONFLICT DO NOTHING
+               )
+               SELECT id FROM novo""",
+            (nome.strip(), responsavel, status_implantacao, list(MODULOS_CHECKLIST)),
         )
         cliente_id = cur.fetchone()["id"]
-        for modulo in MODULOS_CHECKLIST:
-            _exec(
-                conn,
-                "INSERT INTO checklist (cliente_id, modulo, status) VALUES (%s, %s, 'ok') ON CONFLICT DO NOTHING",
-                (cliente_id, modulo),
-            )
-    _invalidar_cache()
+    _invalidar_cache("clientes", "checklist")
     return cliente_id
 
 
+def adicionar_clientes(clientes) -> dict:
+    """Cria vários clientes e seus checklists com uma única query.
+
+    `clientes` é uma lista de tuplas (nome, responsavel) ou
+    (nome, responsavel, status_implantacao). Retorna {nome: id}.
+    """
+    clientes = [
+        (c[0].strip(), c[1], c[2] if len(c) > 2 and c[2] else "3. Novo cliente sem integração")
+        for c in clientes
+    ]
+    if not clientes:
+        return {}
+    nomes, responsaveis, status = (list(col) for col in zip(*clientes))
+    with get_db() as conn:
+        cur = _exec(
+            conn,
+            """WITH novos AS (
+                   INSERT INTO clientes (nome, responsavel, status_implantacao)
+                   SELECT * FROM unnest(%s::text[], %s::text[], %s::text[])
+                   RETURNING id, nome
+               ), checklist_inicial AS (
+                   INSERT INTO checklist (cliente_id, modulo, status)
+                   SELECT novos.id, m.modulo, 'ok'
+                   FROM novos CROSS JOIN unnest(%s::text[]) AS m(modulo)
+                   ON CONFLICT DO NOTHING
+               )
+               SELECT id, nome FROM novos""",
+            (nomes, responsaveis, status, list(MODULOS_CHECKLIST)),
+        )
+        ids = {r["nome"]: r["id"] for r in cur.fetchall()}
+    _invalidar_cache("clientes", "checklist")
+    return ids
+
+
 def atualizar_cliente(cliente_id: int, nome: str, responsavel: str, status_implantacao: str = "3. Novo cliente sem integração"):
     with get_db() as conn:
         _exec(
@@ -138,17 +442,25 @@ def atualizar_cliente(cliente_id: int, nome: str, responsavel: str, status_impla
             "UPDATE clientes SET nome=%s, responsavel=%s, status_implantacao=%s, atualizado_em=CURRENT_TIMESTAMP WHERE id=%s",
             (nome.strip(), responsavel, status_implantacao, cliente_id),
         )
-    _invalidar_cache()
+    _invalidar_cache("clientes")
 
 
 def excluir_cliente(cliente_id: int):
     with get_db() as conn:
-        _exec(conn, "UPDATE clientes SET ativo=0 WHERE id=%s", (cliente_id,))
-    _invalidar_cache()
+        _exec(conn, "UPDATE clientes SET ativo=0, atualizado_em=CURRENT_TIMESTAMP WHERE id=%s", (cliente_id,))
+    _invalidar_cache("clientes")
 
 
 # ─── CHAMADOS ────────────────────────────────────────────────────────────────
 
+# Colunas lidas pelas listagens; ficam explícitas para não trazer a coluna
+# `busca` (tsvector) para o app e para o cache.
+_COLUNAS_CHAMADO = (
+    "ch.id, ch.cliente_id, ch.observacao, ch.categoria, ch.status, ch.responsabilidade, "
+    "ch.responsavel, ch.descricao, ch.resolucao, ch.data_abertura, ch.data_resolucao, "
+    "ch.criado_em, ch.atualizado_em"
+)
+
 def adicionar_chamado(
     cliente_id: int,
     titulo: str,
@@ -169,52 +481,312 @@ def adicionar_chamado(
              descricao, str(data_abertura)),
         )
         chamado_id = cur.fetchone()["id"]
-    _invalidar_cache()
+    _invalidar_cache("chamados")
     return chamado_id
 
 
-@st.cache_data(ttl=30)
+_SELECT_CHAMADOS = f"""
+    SELECT {_COLUNAS_CHAMADO}, cl.nome AS cliente_nome, cl.responsavel AS cliente_responsavel
+         , ch.observacao AS titulo
+    FROM chamados ch
+    JOIN clientes cl ON cl.id = ch.cliente_id
+"""
+
+# Chamados alterados desde a marca, direto ou pelo cliente (nome/responsável)
+_DELTA_CHAMADOS = f"""
+    {_SELECT_CHAMADOS}
+    WHERE ch.id IN (
+        SELECT id FROM chamados WHERE atualizado_em > %(desde)s
+        UNION
+        SELECT c.id FROM chamados c JOIN clientes k ON k.id = c.cliente_id
+        WHERE k.atualizado_em > %(desde)s
+    )
+"""
+
+
+def _delta_chamados(pertence, ordem, decrescente):
+    """Função de delta para a listagem completa de chamados abertos."""
+    def delta(valor, parametros, marca):
+        return _aplicar_delta(
+            valor, _DELTA_CHAMADOS, parametros, marca, {"chamados": "id"},
+            pertence, ordem, decrescente, "delta_chamados",
+        )
+    return delta
+
+
+@_leitor("chamados", "clientes", revalidar=True, delta=_delta_chamados(
+    lambda l, _: l["status"] != "Resolvido", lambda l: (l["data_abertura"], l["id"]), False,
+))
 def listar_chamados_abertos():
     with get_db() as conn:
         cur = _exec(
             conn,
-            """SELECT ch.*, cl.nome AS cliente_nome, cl.responsavel AS cliente_responsavel
-               , ch.observacao AS titulo
-               FROM chamados ch
-               JOIN clientes cl ON cl.id = ch.cliente_id
+            f"""{_SELECT_CHAMADOS}
                WHERE ch.status != 'Resolvido'
-               ORDER BY ch.data_abertura ASC"""
+               ORDER BY ch.data_abertura ASC, ch.id ASC"""
         )
         return cur.fetchall()
 
 
-@st.cache_data(ttl=30)
-def listar_chamados_resolvidos():
+def _filtros_chamados(busca=None, responsavel=None, categoria=None, cliente_id=None):
+    """Monta as condições de WHERE (e parâmetros) comuns às listagens de chamados."""
+    where = []
+    params = []
+    if busca:
+        where.append("cl.nome ILIKE %s")
+        params.append(_padrao_contem(busca))
+    if responsavel and responsavel != "Todos":
+        where.append("ch.responsavel = %s")
+        params.append(responsavel)
+    if categoria and categoria != "Todas":
+        where.append("ch.categoria = %s")
+        params.append(categoria)
+    if cliente_id:
+        where.append("ch.cliente_id = %s")
+        params.append(cliente_id)
+    return where, params
+
+
+# Ordem dos resolvidos (listagem e histórico): sem data de resolução vão para o
+# fim, como a menor data possível; a mesma expressão no ORDER BY, no keyset e
+# no índice idx_chamados_resolvidos_ordem
+_ORDEM_RESOLUCAO = "COALESCE(ch.data_resolucao, DATE '0001-01-01')"
+
+
+def _ordem_resolvido(linha):
+    """Chave do keyset dos resolvidos: (data de resolução ou date.min, id)."""
+    return (linha["data_resolucao"] or date.min, linha["id"])
+
+
+@_leitor("chamados", "clientes", max_entradas=50)
+def listar_chamados_resolvidos_pagina(busca=None, responsavel=None, categoria=None,
+                                      cliente_id=None, cursor=None, limite: int = 50):
+    """Página de chamados resolvidos, mais recentes primeiro.
+
+    Paginação por keyset em (data_resolucao, id): `cursor` é o valor devolvido
+    pela página anterior. Retorna (linhas, próximo cursor ou None).
+    """
+    where, params = _filtros_chamados(busca, responsavel, categoria, cliente_id)
+    where.insert(0, "ch.status = 'Resolvido'")
+    if cursor:
+        where.append(f"({_ORDEM_RESOLUCAO}, ch.id) < (%s, %s)")
+        params.extend(cursor)
+
+    sql = f"""
+        SELECT {_COLUNAS_CHAMADO}, cl.nome AS cliente_nome, cl.responsavel AS cliente_responsavel
+             , ch.observacao AS titulo
+        FROM chamados ch
+        JOIN clientes cl ON cl.id = ch.cliente_id
+        WHERE {' AND '.join(where)}
+        ORDER BY {_ORDEM_RESOLUCAO} DESC, ch.id DESC
+        LIMIT %s
+    """
     with get_db() as conn:
-        cur = _exec(
-            conn,
-            """SELECT ch.*, cl.nome AS cliente_nome, cl.responsavel AS cliente_responsavel
-               , ch.observacao AS titulo
-               FROM chamados ch
-               JOIN clientes cl ON cl.id = ch.cliente_id
-               WHERE ch.status = 'Resolvido'
-               ORDER BY ch.data_resolucao DESC"""
-        )
-        return cur.fetchall()
+        cur = _exec(conn, sql, params + [limite + 1])
+        return _paginar(cur.fetchall(), limite, _ordem_resolvido)
+
 
+def _ordem_abertura(linha):
+    """Chave do keyset da listagem de todos os chamados: (data de abertura, id)."""
+    return (linha["data_abertura"], linha["id"])
+
+
+@_leitor("chamados", "clientes", max_entradas=50)
+def listar_todos_chamados_pagina(busca=None, responsavel=None, categoria=None,
+                                 cliente_id=None, cursor=None, limite: int = 50):
+    """Página de todos os chamados, abertos mais recentemente primeiro.
+
+    Paginação por keyset em (data_abertura, id). Retorna (linhas, próximo cursor ou None).
+    """
+    where, params = _filtros_chamados(busca, responsavel, categoria, cliente_id)
+    if cursor:
+        where.append("(ch.data_abertura, ch.id) < (%s, %s)")
+        params.extend(cursor)
+    clausula = f"WHERE {' AND '.join(where)}" if where else ""
 
-@st.cache_data(ttl=30)
-def listar_todos_chamados():
+    sql = f"""
+        SELECT {_COLUNAS_CHAMADO}, cl.nome AS cliente_nome, cl.responsavel AS cliente_responsavel
+             , ch.observacao AS titulo
+        FROM chamados ch
+        JOIN clientes cl ON cl.id = ch.cliente_id
+        {clausula}
+        ORDER BY ch.data_abertura DESC, ch.id DESC
+        LIMIT %s
+    """
     with get_db() as conn:
-        cur = _exec(
-            conn,
-            """SELECT ch.*, cl.nome AS cliente_nome, cl.responsavel AS cliente_responsavel
-               , ch.observacao AS titulo
-               FROM chamados ch
-               JOIN clientes cl ON cl.id = ch.cliente_id
-               ORDER BY ch.data_abertura DESC"""
+        cur = _exec(conn, sql, params + [limite + 1])
+        return _paginar(cur.fetchall(), limite, _ordem_abertura)
+
+
+@_leitor("chamados", "clientes", "cobrancas", max_entradas=100)
+def buscar_chamados(termo: str, responsavel=None, categoria=None, cliente_id=None,
+                    cursor=None, limite: int = 30):
+    """Busca textual (português) em chamados e nas cobranças de cada chamado.
+
+    `termo` aceita a sintaxe de buscadores: palavras, "frase exata", `or` e
+    `-excluir`. Usa os índices GIN das colunas `busca`; acertos em cobranças
+    somam ao rank do chamado com peso menor. Ordena por relevância e pagina
+    por deslocamento (`cursor` é o offset). Retorna (linhas, próximo cursor ou None);
+    cada linha traz `rank`, `trecho` (termos em **negrito** markdown) e `total`.
+    """
+    if not termo or not termo.strip():
+        return [], None
+    where, params = _filtros_chamados(None, responsavel, categoria, cliente_id)
+    clausula = f"AND {' AND '.join(where)}" if where else ""
+    offset = cursor or 0
+
+    sql = f"""
+        WITH q AS (
+            SELECT websearch_to_tsquery('portuguese', sem_acentos(%s)) AS consulta
+        ), acertos AS (
+            SELECT ch.id, ts_rank(ch.busca, q.consulta) AS rank
+            FROM chamados ch, q
+            WHERE ch.busca @@ q.consulta
+            UNION ALL
+            SELECT cob.chamado_id, 0.5 * ts_rank(cob.busca, q.consulta)
+            FROM cobrancas cob, q
+            WHERE cob.busca @@ q.consulta
+        ), ranking AS (
+            SELECT id, sum(rank) AS rank FROM acertos GROUP BY id
         )
-        return cur.fetchall()
+        SELECT {_COLUNAS_CHAMADO}, cl.nome AS cliente_nome, cl.responsavel AS cliente_responsavel
+             , ch.observacao AS titulo, r.rank
+             , ts_headline('portuguese',
+                           concat_ws(' · ', ch.observacao, ch.descricao, ch.resolucao),
+                           q.consulta, 'StartSel=**, StopSel=**, MaxFragments=2, MaxWords=20, MinWords=5') AS trecho
+             , count(*) OVER () AS total
+        FROM ranking r
+        JOIN chamados ch ON ch.id = r.id
+        JOIN clientes cl ON cl.id = ch.cliente_id
+        CROSS JOIN q
+        WHERE TRUE {clausula}
+        ORDER BY r.rank DESC, ch.id DESC
+        LIMIT %s OFFSET %s
+    """
+    with get_db() as conn:
+        cur = _exec(conn, sql, [termo.strip()] + params + [limite + 1, offset])
+        linhas = cur.fetchall()
+    if len(linhas) > limite:
+        return linhas[:limite], offset + limite
+    return linhas, None
+
+
+# Linha de chamado no formato das listagens, devolvida pelas escritas (RETURNING)
+_RETORNO_CHAMADO = f"""
+    SELECT {_COLUNAS_CHAMADO}, cl.nome AS cliente_nome, cl.responsavel AS cliente_responsavel
+         , ch.observacao AS titulo
+    FROM ch
+    JOIN clientes cl ON cl.id = ch.cliente_id
+"""
+
+
+def _corrigir_lista_chamados(valor, chamado_id, alteracoes, pertence, ordem, decrescente):
+    """Troca/insere/remove o chamado numa listagem em cache, mantendo a ordenação (`ordem`).
+
+    `alteracoes` é a linha completa ou só os campos alterados; sem a linha
+    completa, um chamado que precisa entrar na lista força o recarregamento.
+    """
+    anterior = next((l for l in valor if l["id"] == chamado_id), None)
+    restantes = tuple(l for l in valor if l["id"] != chamado_id)
+    if anterior is not None:
+        linha = alterar(anterior, alteracoes)
+    else:
+        linha = nova_linha(alteracoes, valor[0] if valor else None)
+    if not pertence(linha if linha is not None else alteracoes):
+        return restantes
+    if linha is None:
+        return None
+    return inserir_ordenado(restantes, linha, ordem, decrescente)
+
+
+def _corrigir_pagina(valor, parametros, linha_id, linha, pertence, ordem, decrescente=False):
+    """Troca/insere/remove uma linha numa página por keyset em cache: (linhas, próximo cursor).
+
+    `linha` é a versão nova (None se não está disponível). Ela entra na página
+    se `pertence(linha, parametros)` e sua chave `ordem` cai entre o cursor da
+    página e o próximo cursor. Uma linha que sai de uma página que não é a
+    última a deixaria curta: nesse caso retorna None (recarregar).
+    """
+    linhas, proximo = valor
+    cursor = parametros["cursor"]
+    restantes = tuple(l for l in linhas if l["id"] != linha_id)
+
+    def antes(a, b):
+        return a > b if decrescente else a < b
+
+    entra = linha is not None and pertence(linha, parametros) and (
+        (cursor is None or antes(tuple(cursor), ordem(linha)))
+        and (proximo is None or not antes(tuple(proximo), ordem(linha)))
+    )
+    if not entra:
+        if len(restantes) == len(linhas):
+            return valor
+        return (restantes, None) if proximo is None else None
+
+    nova = nova_linha(linha, linhas[0] if linhas else None)
+    if nova is None:
+        return None
+    novas = inserir_ordenado(restantes, nova, ordem, decrescente)
+    if len(novas) > parametros["limite"]:
+        novas = novas[:parametros["limite"]]
+        proximo = ordem(novas[-1])
+    return novas, proximo
+
+
+def _pertence_resolvidos(linha, p):
+    """A linha passa nos filtros de `listar_chamados_resolvidos_pagina`?"""
+    return (
+        linha["status"] == "Resolvido"
+        and (not p["busca"] or p["busca"].lower() in linha["cliente_nome"].lower())
+        and (not p["responsavel"] or p["responsavel"] == "Todos" or linha["responsavel"] == p["responsavel"])
+        and (not p["categoria"] or p["categoria"] == "Todas" or linha["categoria"] == p["categoria"])
+        and (not p["cliente_id"] or linha["cliente_id"] == p["cliente_id"])
+    )
+
+
+def _correcoes_chamado(chamado_id, alteracoes):
+    """Correções do cache para um chamado alterado (listagem de abertos e páginas de
+    resolvidos e de cobranças).
+
+    `alteracoes` é a linha completa (RETURNING) ou só os campos alterados; sem a
+    linha completa, o chamado só é corrigido nas páginas em que já aparece.
+    """
+    def abertos(valor, _):
+        return _corrigir_lista_chamados(
+            valor, chamado_id, alteracoes,
+            lambda l: l["status"] != "Resolvido", lambda l: (l["data_abertura"], l["id"]), False,
+        )
+
+    def resolvidos(valor, parametros):
+        anterior = next((l for l in valor[0] if l["id"] == chamado_id), None)
+        if anterior is not None:
+            linha = alterar(anterior, alteracoes)
+        elif "id" in alteracoes:
+            linha = alteracoes
+        elif alteracoes.get("status") == "Resolvido":
+            return None
+        else:
+            linha = None
+        return _corrigir_pagina(
+            valor, parametros, chamado_id, linha, _pertence_resolvidos, _ordem_resolvido, True,
+        )
+
+    def cobrancas(valor, _):
+        campos = {
+            chave: alteracoes[origem]
+            for chave, origem in (("chamado_titulo", "observacao"),
+                                  ("chamado_categoria", "categoria"),
+                                  ("chamado_status", "status"))
+            if origem in alteracoes
+        }
+        linhas, proximo = valor
+        return tuple(alterar(l, campos) if l["chamado_id"] == chamado_id else l for l in linhas), proximo
+
+    return {
+        listar_chamados_abertos: abertos,
+        listar_chamados_resolvidos_pagina: resolvidos,
+        listar_cobrancas_pagina: cobrancas,
+    }
 
 
 def atualizar_chamado(chamado_id: int, **campos):
@@ -223,200 +795,357 @@ def atualizar_chamado(chamado_id: int, **campos):
     sets = ", ".join(f"{k}=%s" for k in campos)
     vals = list(campos.values()) + [chamado_id]
     with get_db() as conn:
-        _exec(
+        cur = _exec(
             conn,
-            f"UPDATE chamados SET {sets}, atualizado_em=CURRENT_TIMESTAMP WHERE id=%s",
+            f"""WITH ch AS (
+                    UPDATE chamados SET {sets}, atualizado_em=CURRENT_TIMESTAMP
+                    WHERE id=%s
+                    RETURNING *
+                ) {_RETORNO_CHAMADO}""",
             vals,
         )
-    _invalidar_cache()
+        linha = cur.fetchone()
+    # Troca o chamado nas listagens em cache; mudar o cliente exige recarregar
+    if linha is None or "cliente_id" in campos:
+        _invalidar_cache("chamados")
+    else:
+        corrigir(("chamados",), _correcoes_chamado(chamado_id, linha))
 
 
 def resolver_chamado(chamado_id: int, resolucao: str, data_resolucao=None):
     dr = str(data_resolucao or date.today())
     with get_db() as conn:
-        _exec(
+        cur = _exec(
             conn,
-            """UPDATE chamados
-               SET status='Resolvido', resolucao=%s, data_resolucao=%s, atualizado_em=CURRENT_TIMESTAMP
-               WHERE id=%s""",
+            f"""WITH ch AS (
+                    UPDATE chamados
+                    SET status='Resolvido', resolucao=%s, data_resolucao=%s, atualizado_em=CURRENT_TIMESTAMP
+                    WHERE id=%s
+                    RETURNING *
+                ) {_RETORNO_CHAMADO}""",
             (resolucao, dr, chamado_id),
         )
-    _invalidar_cache()
+        linha = cur.fetchone()
+    # Move o chamado da lista de abertos para a de resolvidos no cache
+    if linha is None:
+        _invalidar_cache("chamados")
+    else:
+        corrigir(("chamados",), _correcoes_chamado(chamado_id, linha))
 
 
 def excluir_chamado(chamado_id: int):
     with get_db() as conn:
         _exec(conn, "DELETE FROM chamados WHERE id=%s", (chamado_id,))
-    _invalidar_cache()
+    _invalidar_cache("chamados", "cobrancas", "checklist")
 
 
-@st.cache_data(ttl=30)
+@_leitor("chamados", "clientes", "cobrancas", revalidar=True)
 def obter_estatisticas():
+    """Monta todo o payload do dashboard em uma única query.
+
+    Contagens e agrupamentos são feitos no banco (CTEs com FILTER/GROUP BY) e
+    devolvidos já agregados via json_agg, de modo que o volume trafegado não
+    cresce com o tamanho da tabela de chamados.
+    """
     with get_db() as conn:
-        # Query 1: todos os contadores em uma única passagem pela tabela
-        kpis = _exec(conn, """
-            SELECT
-                COUNT(*) FILTER (WHERE status != 'Resolvido')                                          AS total_abertos,
-                COUNT(*) FILTER (WHERE status = 'Aguardando cliente')                                  AS aguardando_cliente,
-                COUNT(*) FILTER (WHERE status = 'Resolvido' AND data_resolucao >= CURRENT_DATE - INTERVAL '30 days') AS resolvidos_30d,
-                COUNT(*)                                                                                AS total_geral,
-                COUNT(*) FILTER (WHERE status = 'Resolvido')                                           AS total_resolvidos
-            FROM chamados
-        """).fetchone()
-
-        total_geral     = kpis["total_geral"]
-        total_resolvidos = kpis["total_resolvidos"]
-        taxa = round((total_resolvidos / total_geral * 100) if total_geral > 0 else 0, 1)
-
-        # Query 2: agrupamentos por categoria, responsável e cliente em uma única passagem
-        rows = _exec(conn, """
+        stats = _exec(conn, """
+            -- Contadores mantidos por gatilho (kpi_counters); só a janela de 30 dias
+            -- depende da data corrente e continua sendo contada na tabela
+            WITH kpis AS (
+                SELECT
+                    COALESCE(MAX(valor) FILTER (WHERE chave = 'total_abertos'), 0)      AS total_abertos,
+                    COALESCE(MAX(valor) FILTER (WHERE chave = 'aguardando_cliente'), 0) AS aguardando_cliente,
+                    COALESCE(MAX(valor) FILTER (WHERE chave = 'total_geral'), 0)        AS total_geral,
+                    COALESCE(MAX(valor) FILTER (WHERE chave = 'total_resolvidos'), 0)   AS total_resolvidos,
+                    (
+                        SELECT COUNT(*) FROM chamados
+                        WHERE status = 'Resolvido' AND data_resolucao >= CURRENT_DATE - INTERVAL '30 days'
+                    ) AS resolvidos_30d
+                FROM kpi_counters
+            ),
+            -- Todas as categorias definidas em CATEGORIAS aparecem, mesmo com total 0
+            por_categoria AS (
+                SELECT COALESCE(json_agg(
+                           json_build_object('categoria', c.categoria, 'total', COALESCE(n.total, 0))
+                           ORDER BY COALESCE(n.total, 0) DESC, c.ordem
+                       ), '[]') AS dados
+                FROM unnest(%(categorias)s::text[]) WITH ORDINALITY AS c(categoria, ordem)
+                LEFT JOIN (
+                    SELECT categoria, COUNT(*) AS total
+                    FROM chamados
+                    WHERE status != 'Resolvido'
+                    GROUP BY categoria
+                ) n ON n.categoria = c.categoria
+            ),
+            por_responsavel AS (
+                SELECT COALESCE(json_agg(
+                           json_build_object('responsavel', responsavel, 'total', total)
+                           ORDER BY total DESC, responsavel
+                       ), '[]') AS dados
+                FROM (
+                    SELECT responsavel, COUNT(*) AS total
+                    FROM chamados
+                    WHERE status != 'Resolvido'
+                    GROUP BY responsavel
+                ) r
+            ),
+            por_cliente AS (
+                SELECT COALESCE(json_agg(
+                           json_build_object('cliente', cliente, 'abertos', abertos, 'resolvidos', resolvidos)
+                           ORDER BY abertos + resolvidos DESC, cliente
+                       ), '[]') AS dados
+                FROM (
+                    SELECT
+                        cl.nome AS cliente,
+                        COUNT(*) FILTER (WHERE ch.status != 'Resolvido') AS abertos,
+                        COUNT(*) FILTER (WHERE ch.status = 'Resolvido')  AS resolvidos
+                    FROM chamados ch
+                    JOIN clientes cl ON cl.id = ch.cliente_id
+                    GROUP BY cl.nome
+                ) c
+            ),
+            mais_antigos AS (
+                SELECT COALESCE(json_agg(a ORDER BY a.data_abertura, a.id), '[]') AS dados
+                FROM (
+                    SELECT ch.id, ch.observacao AS titulo, ch.data_abertura, ch.status, ch.categoria,
+                           ch.responsabilidade, ch.responsavel,
+                           cl.nome AS cliente_nome,
+                           cl.status_implantacao AS cliente_status_implantacao
+                    FROM chamados ch
+                    JOIN clientes cl ON cl.id = ch.cliente_id
+                    WHERE ch.status != 'Resolvido'
+                ) a
+            ),
+            cobrancas_atrasadas AS (
+                SELECT COUNT(*) AS n FROM cobrancas
+                WHERE respondido = 0
+                AND data_envio::date <= CURRENT_DATE - INTERVAL '3 days'
+            )
             SELECT
-                ch.categoria,
-                ch.responsavel,
-                cl.nome AS cliente,
-                ch.status
-            FROM chamados ch
-            JOIN clientes cl ON cl.id = ch.cliente_id
-        """).fetchall()
-
-        from collections import defaultdict
-        cat_map  = defaultdict(int)
-        resp_map = defaultdict(int)
-        cli_map  = defaultdict(lambda: {"abertos": 0, "resolvidos": 0})
-
-        for r in rows:
-            if r["status"] != "Resolvido":
-                cat_map[r["categoria"]] += 1
-                resp_map[r["responsavel"]] += 1
-                cli_map[r["cliente"]]["abertos"] += 1
-            else:
-                cli_map[r["cliente"]]["resolvidos"] += 1
-
-        # Garantir que todas as categorias definidas em CATEGORIAS apareçam
-        # no resultado, mesmo que tenham total 0.
-        por_categoria  = [
-            {"categoria": c, "total": int(cat_map.get(c, 0))}
-            for c in CATEGORIAS
-        ]
-        por_categoria = sorted(por_categoria, key=lambda x: -x["total"])
-        por_responsavel = sorted([{"responsavel": k, "total": v} for k, v in resp_map.items()], key=lambda x: -x["total"])
-        por_cliente    = sorted([{"cliente": k, **v} for k, v in cli_map.items()],             key=lambda x: -(x["abertos"] + x["resolvidos"]))
-
-        # Query 3: chamados abertos mais antigos (precisa de dados detalhados)
-        mais_antigos = _exec(conn, """
-            SELECT ch.id, ch.observacao AS titulo, ch.data_abertura, ch.status, ch.categoria,
-                   ch.responsabilidade, ch.responsavel,
-                   cl.nome AS cliente_nome,
-                   cl.status_implantacao AS cliente_status_implantacao
-            FROM chamados ch
-            JOIN clientes cl ON cl.id = ch.cliente_id
-            WHERE ch.status != 'Resolvido'
-            ORDER BY ch.data_abertura ASC
-        """).fetchall()
-
-        # Query 4: cobranças atrasadas
-        cobrancas_sem_resposta = _exec(conn, """
-            SELECT COUNT(*) AS n FROM cobrancas
-            WHERE respondido = 0
-            AND data_envio::date <= CURRENT_DATE - INTERVAL '3 days'
-        """).fetchone()["n"]
-
-        return {
-            "total_abertos":         kpis["total_abertos"],
-            "aguardando_cliente":    kpis["aguardando_cliente"],
-            "resolvidos_30d":        kpis["resolvidos_30d"],
-            "taxa_resolucao":        taxa,
-            "por_categoria":         por_categoria,
-            "por_responsavel":       por_responsavel,
-            "por_cliente":           por_cliente,
-            "mais_antigos":          [dict(r) for r in mais_antigos],
-            "cobrancas_sem_resposta": cobrancas_sem_resposta,
-        }
+                kpis.total_abertos,
+                kpis.aguardando_cliente,
+                kpis.resolvidos_30d,
+                COALESCE(ROUND(kpis.total_resolvidos * 100.0 / NULLIF(kpis.total_geral, 0), 1), 0)::float8 AS taxa_resolucao,
+                por_categoria.dados   AS por_categoria,
+                por_responsavel.dados AS por_responsavel,
+                por_cliente.dados     AS por_cliente,
+                mais_antigos.dados    AS mais_antigos,
+                cobrancas_atrasadas.n AS cobrancas_sem_resposta
+            FROM kpis, por_categoria, por_responsavel, por_cliente, mais_antigos, cobrancas_atrasadas
+        """, {"categorias": list(CATEGORIAS)}).fetchone()
+
+        return dict(stats)
+
+
+@_leitor("chamados", "cobrancas", revalidar=True)
+def obter_kpis():
+    """Lê os contadores de kpi_counters (consulta O(1), independente do histórico)."""
+    with get_db() as conn:
+        cur = _exec(conn, "SELECT chave, valor FROM kpi_counters")
+        return {r["chave"]: r["valor"] for r in cur.fetchall()}
 
 
 # ─── COBRANÇAS ────────────────────────────────────────────────────────────────
 
+_COLUNAS_COBRANCA = (
+    "id, chamado_id, mensagem, data_envio, respondido, resposta_cliente, data_resposta, criado_em"
+)
+
 def adicionar_cobranca(chamado_id: int, mensagem: str, data_envio) -> int:
+    # Insere a cobrança e muda o status do chamado em uma única query; a linha
+    # volta no formato de listar_cobrancas_pagina para corrigir o cache
     with get_db() as conn:
         cur = _exec(
             conn,
-            "INSERT INTO cobrancas (chamado_id, mensagem, data_envio) VALUES (%s, %s, %s) RETURNING id",
+            """WITH nova AS (
+                   INSERT INTO cobrancas (chamado_id, mensagem, data_envio)
+                   VALUES (%s, %s, %s)
+                   RETURNING *
+               ), chamado AS (
+                   UPDATE chamados SET status='Aguardando cliente', atualizado_em=CURRENT_TIMESTAMP
+                   FROM nova
+                   WHERE chamados.id = nova.chamado_id
+                   RETURNING chamados.id, chamados.cliente_id, chamados.observacao,
+                             chamados.categoria, chamados.status, chamados.atualizado_em
+               )
+               SELECT nova.id, nova.chamado_id, nova.mensagem, nova.data_envio, nova.respondido,
+                      nova.resposta_cliente, nova.data_resposta, nova.criado_em,
+                      chamado.observacao AS chamado_titulo,
+                      chamado.categoria  AS chamado_categoria,
+                      chamado.status     AS chamado_status,
+                      cl.id              AS cliente_id,
+                      cl.nome            AS cliente_nome,
+                      cl.responsavel     AS cliente_responsavel,
+                      (CURRENT_DATE - nova.data_envio::date) AS dias_aguardando,
+                      chamado.atualizado_em AS chamado_atualizado_em
+               FROM nova
+               JOIN chamado ON chamado.id = nova.chamado_id
+               JOIN clientes cl ON cl.id = chamado.cliente_id""",
             (chamado_id, mensagem.strip(), str(data_envio)),
         )
-        cobranca_id = cur.fetchone()["id"]
-        _exec(
-            conn,
-            "UPDATE chamados SET status='Aguardando cliente', atualizado_em=CURRENT_TIMESTAMP WHERE id=%s",
-            (chamado_id,),
+        nova = cur.fetchone()
+    _corrigir_cobranca_nova(nova)
+    return nova["id"]
+
+
+def _corrigir_cobranca_nova(nova):
+    """Acrescenta a cobrança nas listagens em cache e atualiza o status do chamado.
+
+    Uma listagem recarregada entre o COMMIT e a correção já traz a cobrança;
+    nesse caso ela fica como está.
+    """
+    chamado_id = nova["chamado_id"]
+    cobranca = {c.strip(): nova[c.strip()] for c in _COLUNAS_COBRANCA.split(",")}
+    com_chamado = {k: v for k, v in nova.items() if k != "chamado_atualizado_em"}
+
+    def ja_tem(valor):
+        return any(l["id"] == nova["id"] for l in valor)
+
+    def por_chamado(valor, parametros):
+        if parametros["chamado_id"] != chamado_id or ja_tem(valor):
+            return valor
+        linha = nova_linha(cobranca, valor[0] if valor else None)
+        return None if linha is None else inserir_ordenado(valor, linha, lambda l: (l["data_envio"], l["id"]))
+
+    correcoes = _correcoes_chamado(chamado_id, {
+        "status": nova["chamado_status"], "atualizado_em": nova["chamado_atualizado_em"],
+    })
+    status_do_chamado = correcoes[listar_cobrancas_pagina]
+
+    def pagina(valor, parametros):
+        valor = status_do_chamado(valor, parametros)
+        if ja_tem(valor[0]):
+            return valor
+        return _corrigir_pagina(
+            valor, parametros, nova["id"], com_chamado, _pertence_cobrancas, _ordem_cobranca,
         )
-    _invalidar_cache()
-    return cobranca_id
 
+    def por_chamados(valor, parametros):
+        if chamado_id not in parametros["chamado_ids"] or ja_tem(valor):
+            return valor
+        linha = nova_linha(cobranca, valor[0] if valor else None)
+        return None if linha is None else inserir_ordenado(
+            valor, linha, lambda l: (l["chamado_id"], l["data_envio"], l["id"]))
+
+    correcoes[listar_cobrancas_por_chamado] = por_chamado
+    correcoes[listar_cobrancas_por_chamados] = por_chamados
+    correcoes[listar_cobrancas_pagina] = pagina
+    corrigir(("cobrancas", "chamados"), correcoes)
 
-@st.cache_data(ttl=30)
+
+@_leitor("cobrancas", max_entradas=200)
 def listar_cobrancas_por_chamado(chamado_id: int):
     with get_db() as conn:
         cur = _exec(
             conn,
-            "SELECT * FROM cobrancas WHERE chamado_id=%s ORDER BY data_envio ASC",
+            f"SELECT {_COLUNAS_COBRANCA} FROM cobrancas WHERE chamado_id=%s ORDER BY data_envio ASC, id ASC",
             (chamado_id,),
         )
         return cur.fetchall()
 
 
-def marcar_respondido(cobranca_id: int, resposta: str, data_resposta=None):
-    dr = str(data_resposta or date.today())
-    with get_db() as conn:
-        # Busca o chamado_id desta cobrança
-        row = _exec(
-            conn, "SELECT chamado_id FROM cobrancas WHERE id=%s", (cobranca_id,)
-        ).fetchone()
-        chamado_id = row["chamado_id"]
+@_leitor("cobrancas", max_entradas=100)
+def listar_cobrancas_por_chamados(chamado_ids):
+    """Cobranças de vários chamados (ex.: uma página da lista) numa única query.
 
-        # Marca a cobrança respondida
-        _exec(
+    Ordenadas por chamado e data de envio; agrupe com `agrupar_por_chamado`.
+    """
+    if not chamado_ids:
+        return []
+    with get_db() as conn:
+        cur = _exec(
             conn,
-            """UPDATE cobrancas
-               SET respondido=1, resposta_cliente=%s, data_resposta=%s
-               WHERE id=%s""",
-            (resposta.strip(), dr, cobranca_id),
+            f"""SELECT {_COLUNAS_COBRANCA} FROM cobrancas
+                WHERE chamado_id = ANY(%s)
+                ORDER BY chamado_id, data_envio ASC, id ASC""",
+            (list(chamado_ids),),
         )
+        return cur.fetchall()
 
-        # Marca todas as cobranças pendentes do mesmo chamado como respondidas também
-        _exec(
-            conn,
-            """UPDATE cobrancas
-               SET respondido=1, resposta_cliente=%s, data_resposta=%s
-               WHERE chamado_id=%s AND respondido=0""",
-            (resposta.strip(), dr, chamado_id),
-        )
 
-        _exec(
+def agrupar_por_chamado(cobrancas) -> dict:
+    """{chamado_id: [cobranças]} a partir de uma lista ordenada por chamado."""
+    grupos = {}
+    for cob in cobrancas:
+        grupos.setdefault(cob["chamado_id"], []).append(cob)
+    return grupos
+
+
+def marcar_respondido(cobranca_id: int, resposta: str, data_resposta=None):
+    """Registra a resposta do cliente em uma única query (CTE de escrita).
+
+    Marca a cobrança e todas as pendentes do mesmo chamado como respondidas e
+    passa o chamado para 'Respondido - Em andamento'. Retorna o id do chamado
+    afetado (None se a cobrança não existir).
+    """
+    dr = str(data_resposta or date.today())
+    with get_db() as conn:
+        row = _exec(
             conn,
-            "UPDATE chamados SET status='Respondido - Em andamento', atualizado_em=CURRENT_TIMESTAMP WHERE id=%s",
-            (chamado_id,),
-        )
-    _invalidar_cache()
+            """WITH alvo AS (
+                   SELECT chamado_id FROM cobrancas WHERE id=%(cobranca_id)s
+               ), respondidas AS (
+                   UPDATE cobrancas cob
+                   SET respondido=1, resposta_cliente=%(resposta)s, data_resposta=%(data)s
+                   FROM alvo
+                   WHERE cob.chamado_id = alvo.chamado_id
+                     AND (cob.id = %(cobranca_id)s OR cob.respondido = 0)
+               ), chamado AS (
+                   UPDATE chamados
+                   SET status='Respondido - Em andamento', atualizado_em=CURRENT_TIMESTAMP
+                   FROM alvo
+                   WHERE chamados.id = alvo.chamado_id
+                   RETURNING chamados.id
+               )
+               SELECT id AS chamado_id FROM chamado""",
+            {"cobranca_id": cobranca_id, "resposta": resposta.strip(), "data": dr},
+        ).fetchone()
+    _invalidar_cache("cobrancas", "chamados")
+    return row["chamado_id"] if row else None
 
 
 def excluir_cobranca(cobranca_id: int):
     with get_db() as conn:
         _exec(conn, "DELETE FROM cobrancas WHERE id=%s", (cobranca_id,))
-    _invalidar_cache()
+    _invalidar_cache("cobrancas")
 
 
-@st.cache_data(ttl=30)
-def listar_todas_cobrancas(apenas_pendentes: bool = False, cliente_id: int = None):
-    where = []
-    params = []
+def _ordem_cobranca(linha):
+    """Chave do keyset da listagem de cobranças (pendentes primeiro, por envio)."""
+    return (linha["respondido"], linha["data_envio"], linha["id"])
+
 
-    if apenas_pendentes:
-        where.append("cob.respondido = 0")
+def _pertence_cobrancas(linha, p):
+    """A linha passa nos filtros de `listar_cobrancas_pagina`?"""
+    return (
+        (p["respondido"] is None or bool(linha["respondido"]) == bool(p["respondido"]))
+        and (not p["cliente_id"] or linha["cliente_id"] == p["cliente_id"])
+        and (not p["responsavel"] or p["responsavel"] == "Todos"
+             or linha["cliente_responsavel"] == p["responsavel"])
+    )
+
+
+@_leitor("cobrancas", "chamados", "clientes", max_entradas=50)
+def listar_cobrancas_pagina(respondido=None, cliente_id=None, responsavel=None,
+                            cursor=None, limite: int = 50):
+    """Página de cobranças: pendentes primeiro, depois por data de envio.
 
+    `respondido` filtra por situação (True/False; None traz todas). Paginação
+    por keyset em (respondido, data_envio, id). Retorna (linhas, próximo cursor ou None).
+    """
+    where = []
+    params = []
+    if respondido is not None:
+        where.append("cob.respondido != 0" if respondido else "cob.respondido = 0")
     if cliente_id:
         where.append("cl.id = %s")
         params.append(cliente_id)
-
+    if responsavel and responsavel != "Todos":
+        where.append("cl.responsavel = %s")
+        params.append(responsavel)
+    if cursor:
+        where.append("(cob.respondido, cob.data_envio, cob.id) > (%s, %s, %s)")
+        params.extend(cursor)
     clausula = f"WHERE {' AND '.join(where)}" if where else ""
 
     sql = f"""
@@ -440,45 +1169,161 @@ def listar_todas_cobrancas(apenas_pendentes: bool = False, cliente_id: int = Non
         JOIN chamados ch ON ch.id = cob.chamado_id
         JOIN clientes cl ON cl.id = ch.cliente_id
         {clausula}
-        ORDER BY cob.respondido ASC, cob.data_envio ASC
+        ORDER BY cob.respondido ASC, cob.data_envio ASC, cob.id ASC
+        LIMIT %s
+    """
+    with get_db() as conn:
+        cur = _exec(conn, sql, params + [limite + 1])
+        return _paginar(cur.fetchall(), limite, _ordem_cobranca)
+
+
+@_leitor("cobrancas", revalidar=True)
+def resumo_cobrancas():
+    """Totais de cobranças para os KPIs da aba, sem carregar as linhas."""
+    with get_db() as conn:
+        cur = _exec(conn, """
+            SELECT
+                COUNT(*)                                                              AS total,
+                COUNT(*) FILTER (WHERE respondido = 0)                                AS pendentes,
+                COUNT(*) FILTER (WHERE respondido = 0
+                                 AND CURRENT_DATE - data_envio::date > 3)             AS atrasadas,
+                COUNT(*) FILTER (WHERE respondido != 0)                               AS respondidas
+            FROM cobrancas
+        """)
+        return dict(cur.fetchone())
+
+
+# ─── CHECKLIST ───────────────────────────────────────────────────────────────
+
+# Pivô do checklist: uma coluna por módulo (nomeada pelo módulo, ex.: row["PDV"]);
+# módulo sem linha conta como 'ok', como no cadastro do cliente
+_PIVO_CHECKLIST = ",\n".join(
+    "coalesce(max(ck.status) FILTER (WHERE ck.modulo = %s), 'ok') AS "
+    + '"' + m.replace('"', '""') + '"'
+    for m in MODULOS_CHECKLIST
+)
+
+# Filtros de obter_checklist_matriz, aplicados sobre os contadores por cliente
+_FILTROS_CHECKLIST = {
+    "problema": "count(*) FILTER (WHERE ck.status = 'problema') > 0",
+    "pendente": "count(*) FILTER (WHERE ck.status <> 'ok') > 0",
+    "construcao": "count(*) FILTER (WHERE ck.status = 'construcao') > 0",
+}
+
+
+@_leitor("checklist", "clientes", max_entradas=50)
+def obter_checklist_matriz(responsavel=None, filtro=None):
+    """Checklist já pivotado: uma linha por cliente ativo, com o status de cada
+    módulo e os totais n_problema, n_construcao e n_na.
+
+    `filtro`: None (todos), "problema", "pendente" (algum módulo não ok) ou "construcao".
+    """
+    where = ["cl.ativo = 1"]
+    params = list(MODULOS_CHECKLIST)
+    if responsavel and responsavel != "Todos":
+        where.append("cl.responsavel = %s")
+        params.append(responsavel)
+    having = f"HAVING {_FILTROS_CHECKLIST[filtro]}" if filtro else ""
+
+    sql = f"""
+        SELECT cl.id AS cliente_id, cl.nome AS cliente_nome,
+               cl.responsavel AS cliente_responsavel,
+               cl.status_implantacao AS cliente_status_implantacao,
+               {_PIVO_CHECKLIST},
+               count(*) FILTER (WHERE ck.status = 'problema')   AS n_problema,
+               count(*) FILTER (WHERE ck.status = 'construcao') AS n_construcao,
+               count(*) FILTER (WHERE ck.status = 'na')         AS n_na
+        FROM clientes cl
+        JOIN checklist ck ON ck.cliente_id = cl.id
+        WHERE {' AND '.join(where)}
+        GROUP BY cl.id
+        {having}
+        ORDER BY cl.nome, cl.id
+    """
+    with get_db() as conn:
+        cur = _exec(conn, sql, params)
+        return cur.fetchall()
+
+
+@_leitor("checklist", "clientes", max_entradas=20)
+def obter_saude_modulos(responsavel=None):
+    """Totais por módulo entre os clientes ativos: contagem por status e % ok / % problema."""
+    where = ["cl.ativo = 1"]
+    params = []
+    if responsavel and responsavel != "Todos":
+        where.append("cl.responsavel = %s")
+        params.append(responsavel)
+
+    sql = f"""
+        SELECT ck.modulo,
+               count(*) AS total,
+               count(*) FILTER (WHERE ck.status = 'ok')         AS ok,
+               count(*) FILTER (WHERE ck.status = 'problema')   AS problema,
+               count(*) FILTER (WHERE ck.status = 'construcao') AS construcao,
+               count(*) FILTER (WHERE ck.status = 'na')         AS na,
+               round(100.0 * count(*) FILTER (WHERE ck.status = 'ok') / count(*), 1)::float AS pct_ok,
+               round(100.0 * count(*) FILTER (WHERE ck.status = 'problema') / count(*), 1)::float AS pct_problema
+        FROM checklist ck
+        JOIN clientes cl ON cl.id = ck.cliente_id
+        WHERE {' AND '.join(where)}
+        GROUP BY ck.modulo
+        ORDER BY ck.modulo
     """
     with get_db() as conn:
         cur = _exec(conn, sql, params if params else None)
         return cur.fetchall()
 
 
-# ─── CHECKLIST ───────────────────────────────────────────────────────────────
+def atualizar_checklist_em_lote(cliente_id: int, status_por_modulo: dict, chamado_id=None) -> int:
+    """Atualiza vários módulos de um cliente em uma única query e transação.
 
-@st.cache_data(ttl=30)
-def obter_checklist_completo():
+    `status_por_modulo` é {modulo: status}. Retorna o número de linhas alteradas.
+    """
+    if not status_por_modulo:
+        return 0
     with get_db() as conn:
         cur = _exec(
             conn,
-            """SELECT ck.*, cl.nome AS cliente_nome, cl.responsavel AS cliente_responsavel,
-                      cl.status_implantacao AS cliente_status_implantacao
-               FROM checklist ck
-               JOIN clientes cl ON cl.id = ck.cliente_id
-               WHERE cl.ativo = 1
-               ORDER BY cl.nome, ck.modulo"""
+            """UPDATE checklist ck
+               SET status=v.status, chamado_id=%s, atualizado_em=CURRENT_TIMESTAMP
+               FROM unnest(%s::text[], %s::text[]) AS v(modulo, status)
+               WHERE ck.cliente_id=%s AND ck.modulo=v.modulo""",
+            (chamado_id, list(status_por_modulo), list(status_por_modulo.values()), cliente_id),
         )
-        return cur.fetchall()
+        alterados = cur.rowcount
+    _invalidar_cache("checklist")
+    return alterados
+
 
+def atualizar_checklist_em_lote_clientes(alteracoes) -> int:
+    """Versão entre clientes: aplica [(cliente_id, modulo, status, chamado_id), ...] de uma vez.
 
-def atualizar_status_modulo(cliente_id: int, modulo: str, status: str, chamado_id=None):
+    Pares (cliente_id, modulo) repetidos ficam com a última alteração, como
+    num UPDATE por linha. Retorna o número de linhas alteradas.
+    """
+    # Um UPDATE ... FROM aplica só uma das linhas que casam, sem ordem definida
+    ultimas = {(a[0], a[1]): a for a in alteracoes}
+    if not ultimas:
+        return 0
+    cliente_ids, modulos, status, chamado_ids = (list(col) for col in zip(*ultimas.values()))
     with get_db() as conn:
-        _exec(
+        cur = _exec(
             conn,
-            """UPDATE checklist
-               SET status=%s, chamado_id=%s, atualizado_em=CURRENT_TIMESTAMP
-               WHERE cliente_id=%s AND modulo=%s""",
-            (status, chamado_id, cliente_id, modulo),
+            """UPDATE checklist ck
+               SET status=v.status, chamado_id=v.chamado_id, atualizado_em=CURRENT_TIMESTAMP
+               FROM unnest(%s::int[], %s::text[], %s::text[], %s::int[])
+                    AS v(cliente_id, modulo, status, chamado_id)
+               WHERE ck.cliente_id=v.cliente_id AND ck.modulo=v.modulo""",
+            (cliente_ids, modulos, status, chamado_ids),
         )
-    _invalidar_cache()
+        alterados = cur.rowcount
+    _invalidar_cache("checklist")
+    return alterados
 
 
-@st.cache_data(ttl=30)
-def obter_historico(data_inicio=None, data_fim=None, responsavel=None,
-                    categoria=None, responsabilidade=None):
+def _filtros_historico(data_inicio=None, data_fim=None, responsavel=None,
+                       categoria=None, responsabilidade=None):
+    """Monta as condições de WHERE (e parâmetros) do histórico de resolvidos."""
     where = ["ch.status = 'Resolvido'"]
     params = []
     if data_inicio:
@@ -496,15 +1341,64 @@ def obter_historico(data_inicio=None, data_fim=None, responsavel=None,
     if responsabilidade and responsabilidade != "Todas":
         where.append("ch.responsabilidade = %s")
         params.append(responsabilidade)
+    return where, params
+
+
+@_leitor("chamados", "clientes", max_entradas=50)
+def obter_historico_pagina(data_inicio=None, data_fim=None, responsavel=None,
+                           categoria=None, responsabilidade=None,
+                           cursor=None, limite: int = 100):
+    """Página do histórico filtrado, mais recentes primeiro.
+
+    Usa o índice idx_chamados_resolvidos_ordem e paginação por keyset em
+    (data_resolucao, id). Retorna (linhas, próximo cursor ou None).
+    """
+    where, params = _filtros_historico(data_inicio, data_fim, responsavel, categoria, responsabilidade)
+    if cursor:
+        where.append(f"({_ORDEM_RESOLUCAO}, ch.id) < (%s, %s)")
+        params.extend(cursor)
 
     sql = f"""
-        SELECT ch.*, ch.observacao AS titulo, cl.nome AS cliente_nome,
+        SELECT {_COLUNAS_CHAMADO}, ch.observacao AS titulo, cl.nome AS cliente_nome,
                (ch.data_resolucao::date - ch.data_abertura::date) AS dias_resolucao
         FROM chamados ch
         JOIN clientes cl ON cl.id = ch.cliente_id
         WHERE {' AND '.join(where)}
-        ORDER BY ch.data_resolucao DESC
+        ORDER BY {_ORDEM_RESOLUCAO} DESC, ch.id DESC
+        LIMIT %s
     """
     with get_db() as conn:
-        cur = _exec(conn, sql, params if params else None)
-        return cur.fetchall()
+        cur = _exec(conn, sql, params + [limite + 1])
+        return _paginar(cur.fetchall(), limite, _ordem_resolvido)
+
+
+@_leitor("chamados", max_entradas=50)
+def contar_historico(data_inicio=None, data_fim=None, responsavel=None,
+                     categoria=None, responsabilidade=None) -> int:
+    where, params = _filtros_historico(data_inicio, data_fim, responsavel, categoria, responsabilidade)
+    with get_db() as conn:
+        cur = _exec(
+            conn,
+            f"SELECT COUNT(*) AS n FROM chamados ch WHERE {' AND '.join(where)}",
+            params if params else None,
+        )
+        return cur.fetchone()["n"]
+
+
+def iterar_historico(data_inicio=None, data_fim=None, responsavel=None,
+                     categoria=None, responsabilidade=None, tamanho_lote: int = 2000):
+    """Percorre o histórico filtrado em lotes, via cursor nomeado (server-side).
+
+    Gera listas de tuplas (cliente, título, responsável, abertura, resolução),
+    na mesma ordem de `obter_historico_pagina`, sem materializar o resultado inteiro em memória; usado na exportação CSV.
+    """
+    where, params = _filtros_historico(data_inicio, data_fim, responsavel, categoria, responsabilidade)
+    sql = f"""
+        SELECT cl.nome, ch.observacao, ch.responsavel, ch.data_abertura, ch.data_resolucao
+        FROM chamados ch
+        JOIN clientes cl ON cl.id = ch.cliente_id
+        WHERE {' AND '.join(where)}
+        ORDER BY {_ORDEM_RESOLUCAO} DESC, ch.id DESC
+    """
+    with get_db() as conn:
+        yield from _exec_em_lotes(conn, sql, params, tamanho_lote)
@@ -0,0 +1,162 @@
+"""Roda EXPLAIN (ANALYZE, BUFFERS) nas consultas de leitura de `operations.py`.
+
+Cada função de leitura registrada no cache (`_leitor`) é chamada uma vez
+com argumentos de exemplo; o SQL que ela executa é capturado e reexecutado
+com EXPLAIN dentro de uma transação desfeita em seguida. O relatório lista
+tempo, buffers e os Seq Scans encontrados em tabelas com pelo menos
+`--min-linhas` linhas (em tabelas pequenas o planner prefere varrer mesmo).
+
+Uso:
+    python -m src.scripts.explain_queries
+    python -m src.scripts.explain_queries --min-linhas 0 --detalhes
+"""
+import argparse
+import inspect
+import sys
+
+from src.database import operations as ops
+from src.database.cache import LEITORES_POR_TABELA
+
+# Argumentos para as leituras que têm parâmetros obrigatórios
+ARGUMENTOS_EXEMPLO = {
+    "buscar_chamados": {"termo": "erro"},
+    "buscar_clientes": {"termo": "cliente"},
+    "listar_cobrancas_por_chamado": {"chamado_id": None},  # preenchido em exemplo_chamado_id()
+    "listar_cobrancas_por_chamados": {"chamado_ids": None},  # idem, uma página de chamados
+}
+
+
+def leituras():
+    """Funções de leitura registradas no cache, sem repetição, em ordem de nome."""
+    unicas = {}
+    for funcoes in LEITORES_POR_TABELA.values():
+        for funcao in funcoes:
+            unicas[funcao.__name__] = funcao
+    return [unicas[nome] for nome in sorted(unicas)]
+
+
+def exemplo_chamado_id():
+    """Chamado com mais cobranças (o caso mais caro para a leitura por chamado)."""
+    with ops.get_db() as conn:
+        cur = ops._exec(conn, """
+            SELECT chamado_id FROM cobrancas GROUP BY chamado_id ORDER BY count(*) DESC LIMIT 1
+        """, nome="explain_queries")
+        linha = cur.fetchone()
+    return linha["chamado_id"] if linha else 0
+
+
+def capturar_sql(funcao, argumentos):
+    """Chama a função (sem cache) e devolve as consultas [(sql, params)] que ela executou."""
+    capturadas = []
+    original = ops._exec
+
+    def _exec_capturando(conn, sql, params=None, nome=None):
+        capturadas.append((sql, params))
+        return original(conn, sql, params, nome or funcao.__name__)
+
+    ops._exec = _exec_capturando
+    try:
+        funcao.clear()
+        funcao(**argumentos)
+    finally:
+        ops._exec = original
+        funcao.clear()
+    return capturadas
+
+
+def explicar(sql, params):
+    """Plano JSON de EXPLAIN (ANALYZE, BUFFERS); a transação é desfeita."""
+    with ops.get_db() as conn:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+                return cur.fetchone()[0][0]
+        finally:
+            conn.rollback()
+
+
+def nos(plano):
+    """Percorre todos os nós do plano (o nó raiz e os filhos, recursivamente)."""
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from nos(filho)
+
+
+def linhas_por_tabela():
+    with ops.get_db() as conn:
+        cur = ops._exec(conn, """
+            SELECT c.relname, greatest(c.reltuples, 0)::bigint AS linhas
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind = 'r' AND n.nspname = current_schema()
+        """, nome="explain_queries")
+        return {r["relname"]: r["linhas"] for r in cur.fetchall()}
+
+
+def relatorio(min_linhas=1000, detalhes=False):
+    """Imprime o relatório e retorna o número de Seq Scans relevantes encontrados."""
+    tamanhos = linhas_por_tabela()
+    chamado_id = exemplo_chamado_id()
+    ARGUMENTOS_EXEMPLO["listar_cobrancas_por_chamado"]["chamado_id"] = chamado_id
+    ARGUMENTOS_EXEMPLO["listar_cobrancas_por_chamados"]["chamado_ids"] = tuple(
+        range(chamado_id, chamado_id + 30))
+    total_seq = 0
+
+    for funcao in leituras():
+        nome = funcao.__name__
+        argumentos = ARGUMENTOS_EXEMPLO.get(nome, {})
+        obrigatorios = [
+            p.name for p in inspect.signature(funcao).parameters.values()
+            if p.default is inspect.Parameter.empty and p.name not in argumentos
+        ]
+        if obrigatorios:
+            print(f"- {nome}: pulada (sem exemplo para {', '.join(obrigatorios)})")
+            continue
+
+        for i, (sql, params) in enumerate(capturar_sql(funcao, argumentos), start=1):
+            plano = explicar(sql, params)
+            raiz = plano["Plan"]
+            rotulo = nome if i == 1 else f"{nome} [{i}]"
+            print(
+                f"- {rotulo}: {plano['Execution Time']:.1f} ms, "
+                f"buffers hit={raiz.get('Shared Hit Blocks', 0)} read={raiz.get('Shared Read Blocks', 0)}"
+            )
+
+            for no in nos(raiz):
+                if no["Node Type"] != "Seq Scan":
+                    continue
+                tabela = no["Relation Name"]
+                if tamanhos.get(tabela, 0) < min_linhas:
+                    continue
+                total_seq += 1
+                filtro = f" filtro: {no['Filter']}" if "Filter" in no else ""
+                print(f"    ⚠ Seq Scan em {tabela} (~{tamanhos[tabela]} linhas, "
+                      f"{no.get('Actual Rows', 0)} retornadas){filtro}")
+
+            if detalhes:
+                print("    " + " ".join(sql.split()))
+
+    return total_seq
+
+
+def main():
+    p = argparse.ArgumentParser(description="EXPLAIN (ANALYZE, BUFFERS) das consultas de leitura")
+    p.add_argument("--min-linhas", type=int, default=1000,
+                   help="Ignora Seq Scans em tabelas menores que isto (padrão: 1000)")
+    p.add_argument("--detalhes", action="store_true", help="Mostra o SQL de cada consulta")
+    args = p.parse_args()
+
+    try:
+        total_seq = relatorio(args.min_linhas, args.detalhes)
+    except Exception as e:
+        print(f"Erro ao analisar consultas: {e}")
+        sys.exit(2)
+
+    if total_seq:
+        print(f"\n{total_seq} Seq Scan(s) em tabelas grandes.")
+        sys.exit(1)
+    print("\nNenhum Seq Scan em tabelas grandes.")
+
+
+if __name__ == '__main__':
+    main()
@@ -25,10 +25,13 @@ def importar_clientes(source_path, dry_run=False):
 
     existing = {c['nome'] for c in ops.listar_clientes(apenas_ativos=False)}
     added = []
+    novos = []
 
     for r in cur.fetchall():
         keys = r.keys()
         nome = r['nome'] if 'nome' in keys else (r['nome_cliente'] if 'nome_cliente' in keys else None)
+        # Mesma normalização de adicionar_clientes, que grava o nome sem espaços nas pontas
+        nome = (nome or '').strip()
         responsavel = r['responsavel'] if 'responsavel' in keys else (r['contato'] if 'contato' in keys else '')
         if 'status_implantacao' in keys:
             status_impl = r['status_implantacao']
@@ -44,10 +47,16 @@ def importar_clientes(source_path, dry_run=False):
             print(f"[DRY] Criar cliente: {nome}")
             added.append({'nome': nome, 'id': None})
         else:
-            cid = ops.adicionar_cliente(nome, responsavel or '', status_impl or '3. Novo cliente sem integração')
+            novos.append((nome, responsavel or '', status_impl or '3. Novo cliente sem integração'))
+        existing.add(nome)
+
+    # Cria todos os clientes novos (e seus checklists) de uma vez
+    if novos:
+        ids = ops.adicionar_clientes(novos)
+        for nome, _, _ in novos:
+            cid = ids.get(nome)
             print(f"Criado cliente: {nome} -> id {cid}")
             added.append({'nome': nome, 'id': cid})
-            existing.add(nome)
 
     src_conn.close()
     print(f"Importação de clientes concluída. Total adicionados: {len(added)}")
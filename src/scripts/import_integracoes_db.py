@@ -5,10 +5,14 @@ Uso:
 
 O script mapeia clientes, chamados, cobranças e checklist do DB fonte
 para o DB do projeto (`gestao.db`) usando as funções de `src.database.operations`.
+Clientes são reaproveitados só quando o nome normalizado é igual; nomes apenas
+parecidos geram um aviso de possível duplicata (ou são mesclados com
+`--mesclar-parecidos`).
 """
 import argparse
 import sqlite3
 import sys
+import unicodedata
 from datetime import datetime
 
 from src.database import operations as ops
@@ -21,15 +25,43 @@ def row_get(r, key, default=None):
         return default
 
 
-def importar(source_path, dry_run=False):
+# Score mínimo (pg_trgm) para apontar um nome do DB fonte como possível
+# duplicata de um cliente já cadastrado. Nomes de filiais ("Loja 1" / "Loja 2")
+# passam desse score, então só há mescla com --mesclar-parecidos.
+LIMIAR_SIMILARIDADE = 0.8
+
+
+def normalizar(nome):
+    """Chave de comparação de nomes: sem espaços nas pontas, minúsculo e sem acentos."""
+    decomposto = unicodedata.normalize('NFKD', (nome or '').strip().lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def cliente_parecido(nome, mesclar):
+    """Cliente já cadastrado com nome quase igual, ou None.
+
+    Sem `mesclar`, só avisa da possível duplicata e retorna None (o nome vira
+    um cliente novo); com `mesclar`, retorna o cliente para usar no lugar.
+    """
+    if not nome:
+        return None
+    parecido = ops.cliente_mais_parecido(nome, LIMIAR_SIMILARIDADE)
+    if parecido and not mesclar:
+        print(f"Possível duplicata: {nome} ~ {parecido['nome']} "
+              f"(id {parecido['id']}, score {parecido['score']:.2f})")
+        return None
+    return parecido
+
+
+def importar(source_path, dry_run=False, mesclar_parecidos=False):
     src_conn = sqlite3.connect(source_path)
     src_conn.row_factory = sqlite3.Row
     cur = src_conn.cursor()
 
-    # Cache clientes existentes no DB alvo
-    existing = {c['nome']: c['id'] for c in ops.listar_clientes(apenas_ativos=False)}
+    # Cache clientes existentes no DB alvo, pelo nome normalizado
+    existing = {normalizar(c['nome']): c['id'] for c in ops.listar_clientes(apenas_ativos=False)}
 
-    cliente_map = {}  # nome -> id alvo
+    cliente_map = {}  # nome normalizado -> id alvo
     chamado_map = {}  # id_origem -> id_alvo
 
     # --- Clientes ---
@@ -41,24 +73,38 @@ def importar(source_path, dry_run=False):
     else:
         cur_clients = cur.fetchall()
 
+    novos_clientes = []
     for r in cur_clients:
-        nome = row_get(r, 'nome') or row_get(r, 'nome_cliente')
+        # Mesma normalização de adicionar_clientes, que grava o nome sem espaços nas pontas
+        nome = (row_get(r, 'nome') or row_get(r, 'nome_cliente') or '').strip()
         responsavel = row_get(r, 'responsavel') or ''
         status_impl = row_get(r, 'status_implantacao') or '3. Novo cliente sem integração'
         if not nome:
             continue
-        if nome in existing:
-            cliente_id = existing[nome]
+        chave = normalizar(nome)
+        parecido = None if chave in existing else cliente_parecido(nome, mesclar_parecidos)
+        if chave in existing:
+            cliente_id = existing[chave]
             print(f"Cliente existente: {nome} -> id {cliente_id}")
+        elif parecido:
+            cliente_id = existing[chave] = parecido['id']
+            print(f"Cliente parecido: {nome} -> {parecido['nome']} (id {cliente_id})")
         else:
+            cliente_id = None
             if dry_run:
-                cliente_id = None
                 print(f"[DRY] Criar cliente: {nome}")
             else:
-                cliente_id = ops.adicionar_cliente(nome, responsavel, status_impl)
-                print(f"Criado cliente: {nome} -> id {cliente_id}")
-            existing[nome] = cliente_id
-        cliente_map[nome] = cliente_id
+                novos_clientes.append((nome, responsavel, status_impl))
+            existing[chave] = cliente_id
+        cliente_map[chave] = cliente_id
+
+    # Cria todos os clientes novos (e seus checklists) de uma vez
+    if novos_clientes:
+        ids = ops.adicionar_clientes(novos_clientes)
+        for nome, _, _ in novos_clientes:
+            chave = normalizar(nome)
+            cliente_map[chave] = existing[chave] = ids.get(nome)
+            print(f"Criado cliente: {nome} -> id {cliente_map[chave]}")
 
     # --- Chamados ---
     try:
@@ -84,8 +130,14 @@ def importar(source_path, dry_run=False):
 
         if not cliente_nome:
             cliente_nome = row_get(r, 'cliente_nome') or row_get(r, 'nome_cliente')
+        cliente_nome = (cliente_nome or '').strip() or None
 
-        target_cliente_id = cliente_map.get(cliente_nome)
+        chave = normalizar(cliente_nome)
+        target_cliente_id = cliente_map.get(chave, existing.get(chave))
+        if target_cliente_id is None:
+            parecido = cliente_parecido(cliente_nome, mesclar_parecidos)
+            if parecido:
+                target_cliente_id = cliente_map[chave] = parecido['id']
         if target_cliente_id is None:
             # cria cliente genérico se não existir
             if dry_run:
@@ -93,7 +145,7 @@ def importar(source_path, dry_run=False):
                 target_cliente_id = None
             else:
                 target_cliente_id = ops.adicionar_cliente(cliente_nome or f"Cliente {old_id}", "", "3. Novo cliente sem integração")
-                cliente_map[cliente_nome] = target_cliente_id
+                cliente_map[chave] = target_cliente_id
 
         titulo = row_get(r, 'titulo') or ''
         categoria = row_get(r, 'categoria') or ''
@@ -186,6 +238,7 @@ def importar(source_path, dry_run=False):
     else:
         cur_ck = cur.fetchall()
 
+    alteracoes_checklist = []
     for r in cur_ck:
         cliente_id_origem = row_get(r, 'cliente_id')
         try:
@@ -194,7 +247,7 @@ def importar(source_path, dry_run=False):
         except Exception:
             nome = None
 
-        target_cliente_id = cliente_map.get(nome)
+        target_cliente_id = cliente_map.get(normalizar(nome))
         modulo = row_get(r, 'modulo')
         status = row_get(r, 'status')
         chamado_origem = row_get(r, 'chamado_id')
@@ -205,8 +258,13 @@ def importar(source_path, dry_run=False):
         if dry_run:
             print(f"[DRY] Atualizar checklist cliente={nome} modulo={modulo} status={status}")
             continue
+        alteracoes_checklist.append((target_cliente_id, modulo, status or 'ok', chamado_target))
+
+    # Aplica todas as alterações de checklist em uma única query
+    if alteracoes_checklist:
         try:
-            ops.atualizar_status_modulo(target_cliente_id, modulo, status or 'ok', chamado_target)
+            n = ops.atualizar_checklist_em_lote_clientes(alteracoes_checklist)
+            print(f"Checklist: {n} módulo(s) atualizados.")
         except Exception as e:
             print(f"Erro ao atualizar checklist: {e}")
 
@@ -219,10 +277,12 @@ def main():
     p = argparse.ArgumentParser(description="Importador de .db de integrações para gestao.db")
     p.add_argument("--source", required=True, help="Caminho para o arquivo SQLite fonte (.db)")
     p.add_argument("--dry-run", action="store_true", help="Executar sem gravar no DB alvo")
+    p.add_argument("--mesclar-parecidos", action="store_true",
+                   help="Usar o cliente já cadastrado de nome parecido em vez de avisar e criar um novo")
     args = p.parse_args()
 
     try:
-        importar(args.source, dry_run=args.dry_run)
+        importar(args.source, dry_run=args.dry_run, mesclar_parecidos=args.mesclar_parecidos)
     except Exception as e:
         print(f"Erro durante importação: {e}")
         sys.exit(1)
@@ -39,10 +39,13 @@ def sync(source_path):
     added = 0
     updated = 0
     details = []
+    novos = []
+    nomes_novos = set()
 
     for r in source_clients:
         keys = r.keys()
-        nome = get_val(r, keys, 'nome', 'nome_cliente')
+        # Mesma normalização de adicionar_clientes, que grava o nome sem espaços nas pontas
+        nome = (get_val(r, keys, 'nome', 'nome_cliente') or '').strip()
         if not nome:
             continue
         responsavel = get_val(r, keys, 'responsavel', 'contato') or ''
@@ -58,10 +61,16 @@ def sync(source_path):
                 ops.atualizar_cliente(tc_id, nome, responsavel, status_impl)
                 updated += 1
                 details.append({'nome': nome, 'action': 'updated', 'id': tc_id})
-        else:
-            cid = ops.adicionar_cliente(nome, responsavel, status_impl)
+        elif nome not in nomes_novos:
+            nomes_novos.add(nome)
+            novos.append((nome, responsavel, status_impl))
+
+    # Cria todos os clientes ausentes (e seus checklists) de uma vez
+    if novos:
+        ids = ops.adicionar_clientes(novos)
+        for nome, _, _ in novos:
             added += 1
-            details.append({'nome': nome, 'action': 'added', 'id': cid})
+            details.append({'nome': nome, 'action': 'added', 'id': ids.get(nome)})
 
     src_conn.close()
     print(f"Clientes adicionados: {added}")
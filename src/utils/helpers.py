@@ -82,3 +82,35 @@ def exibir_mensagens_persistentes():
             st.warning(m["texto"])
         else:
             st.info(m["texto"])
+
+
+def cursor_pagina_atual(chave: str, filtros: tuple):
+    """Cursor da página exibida; volta à primeira página quando os filtros mudam."""
+    estado = st.session_state.get(chave)
+    if estado is None or estado["filtros"] != filtros:
+        estado = {"filtros": filtros, "cursores": [None]}
+        st.session_state[chave] = estado
+    return estado["cursores"][-1]
+
+
+def renderizar_paginacao(chave: str, proximo_cursor):
+    """Botões de navegação anterior/próxima para listagens paginadas por keyset."""
+    estado = st.session_state[chave]
+    pagina = len(estado["cursores"])
+    if pagina == 1 and proximo_cursor is None:
+        return
+
+    col_ant, col_info, col_prox = st.columns([1, 2, 1])
+    with col_ant:
+        if st.button("← Anterior", key=f"{chave}_anterior", disabled=pagina == 1, use_container_width=True):
+            estado["cursores"].pop()
+            st.rerun()
+    with col_info:
+        st.markdown(
+            f'<div style="text-align:center;padding-top:8px;color:#6c757d;font-size:13px">Página {pagina}</div>',
+            unsafe_allow_html=True,
+        )
+    with col_prox:
+        if st.button("Próxima →", key=f"{chave}_proxima", disabled=proximo_cursor is None, use_container_width=True):
+            estado["cursores"].append(proximo_cursor)
+            st.rerun()
@@ -0,0 +1,70 @@
+"""Templates HTML pré-compilados e cache do HTML das tabelas grandes.
+
+`Modelo` separa o template em partes uma única vez; cada chamada só junta as
+partes com os valores (escapados, salvo `{campo!s}`, para HTML já montado).
+
+`html_em_cache(nome, dados, filtros, gerar)` devolve o HTML guardado enquanto
+`dados` for o mesmo snapshot do cache de leituras (ver `database/cache.py`:
+uma leitura sem mudanças devolve sempre o mesmo objeto), com os mesmos
+filtros e no mesmo dia (as tabelas mostram "dias em aberto").
+"""
+import string
+import threading
+from collections import OrderedDict
+from datetime import date
+from html import escape
+
+import streamlit as st
+
+_MAX_TABELAS = 32
+
+
+class Modelo:
+    """Template com campos `{nome}` (escapado) ou `{nome!s}` (inserido como está)."""
+    __slots__ = ("_partes",)
+
+    def __init__(self, texto: str):
+        self._partes = tuple(
+            (literal, campo, conversao == "s")
+            for literal, campo, _, conversao in string.Formatter().parse(texto)
+        )
+
+    def __call__(self, **valores) -> str:
+        saida = []
+        for literal, campo, cru in self._partes:
+            saida.append(literal)
+            if campo is not None:
+                valor = valores[campo]
+                saida.append(str(valor) if cru else escape(str(valor)))
+        return "".join(saida)
+
+
+class _TabelasHtml:
+    def __init__(self):
+        self.trava = threading.Lock()
+        # (nome, filtros, dia) → (snapshot de origem, html), da usada há mais tempo à mais recente
+        self.entradas = OrderedDict()
+
+
+@st.cache_resource
+def _tabelas():
+    return _TabelasHtml()
+
+
+def html_em_cache(nome: str, dados, filtros: tuple, gerar) -> str:
+    """HTML de `gerar()`, reaproveitado enquanto `dados`, `filtros` e o dia não mudarem."""
+    tabelas = _tabelas()
+    chave = (nome, filtros, date.today())
+    with tabelas.trava:
+        entrada = tabelas.entradas.get(chave)
+        if entrada is not None and entrada[0] is dados:
+            tabelas.entradas.move_to_end(chave)
+            return entrada[1]
+
+    html = gerar()
+    with tabelas.trava:
+        tabelas.entradas[chave] = (dados, html)
+        tabelas.entradas.move_to_end(chave)
+        while len(tabelas.entradas) > _MAX_TABELAS:
+            tabelas.entradas.popitem(last=False)
+    return html